@@ -1,56 +1,71 @@
 import json
 import os
+import sys
+import time
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, DateTime
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from urllib.parse import urlparse, parse_qs
 
-Base = declarative_base()
+# Modelos, engine e consultas vêm da camada compartilhada em backend/
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
-class Leitura(Base):
-    __tablename__ = "leituras"
-    id = Column(Integer, primary_key=True, index=True)
-    codigo_barras = Column(String, index=True)
-    descricao = Column(String, default="Não identificado")
-    quantidade = Column(Integer, default=1)
-    data_hora = Column(DateTime, default=datetime.utcnow)
+from repository import listar_leituras, LIMITE_PADRAO, LIMITE_MAXIMO
 
-def get_db():
-    DATABASE_URL = os.getenv("DATABASE_URL")
-    if not DATABASE_URL:
-        raise ValueError("DATABASE_URL não configurada no Vercel")
-    
-    if DATABASE_URL.startswith("postgres://"):
-        DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-    
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-    Base.metadata.create_all(bind=engine)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    return SessionLocal()
+def _query_params(request):
+    args = getattr(request, 'args', None)
+    if args is not None:
+        return {k: args.get(k) for k in args}
+    url = getattr(request, 'url', None) or getattr(request, 'path', '') or ''
+    return {k: v[0] for k, v in parse_qs(urlparse(str(url)).query).items()}
 
 def handler(request):
     headers = {
         'Access-Control-Allow-Origin': '*',
         'Access-Control-Allow-Methods': 'GET, OPTIONS',
         'Access-Control-Allow-Headers': 'Content-Type',
+        'Access-Control-Expose-Headers': 'X-Next-Cursor',
         'Content-Type': 'application/json'
     }
+    inicio = time.perf_counter()
     
     if request.method == 'OPTIONS':
         return {'statusCode': 200, 'headers': headers, 'body': ''}
     
     try:
-        db = get_db()
-        leituras = db.query(Leitura).order_by(Leitura.data_hora.desc()).all()
+        params = _query_params(request)
+        limit = max(1, min(int(params.get('limit') or LIMITE_PADRAO), LIMITE_MAXIMO))
+        since = datetime.fromisoformat(params['since']) if params.get('since') else None
+        until = datetime.fromisoformat(params['until']) if params.get('until') else None
+    except Exception as e:
+        return {
+            'statusCode': 400,
+            'headers': headers,
+            'body': json.dumps({"error": f"Parâmetros inválidos: {e}"})
+        }
+    
+    try:
+        inicio_db = time.perf_counter()
+        from database_vercel import SessionLocal, registrar_tempo
+        db = SessionLocal()
+        try:
+            leituras, proximo = listar_leituras(
+                db, since, until, params.get('codigo_barras'), params.get('cursor'), limit
+            )
+        except ValueError as e:
+            return {'statusCode': 400, 'headers': headers, 'body': json.dumps({"error": str(e)})}
+        
+        if proximo:
+            headers['X-Next-Cursor'] = proximo
         
         response = [{
             "id": l.id,
             "codigo_barras": l.codigo_barras,
             "descricao": l.descricao,
             "quantidade": l.quantidade,
-            "data_hora": l.data_hora.isoformat()
+            "data_hora": l.data_hora.isoformat(),
+            "stream_id": l.stream_id
         } for l in leituras]
         
+        registrar_tempo(headers, inicio, inicio_db)
         return {'statusCode': 200, 'headers': headers, 'body': json.dumps(response)}
         
     except Exception as e:
@@ -61,4 +76,4 @@ def handler(request):
         }
     finally:
         if 'db' in locals():
-            db.close()
\ No newline at end of file
+            db.close()
@@ -1,48 +1,20 @@
 import json
 import os
-from datetime import datetime
+import sys
+import time
 
-def handler(request):
-    headers = {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type',
-        'Content-Type': 'application/json'
+# Modelos, engine e consultas vêm da camada compartilhada em backend/
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from repository import cadastrar_produto, listar_produtos
+
+def _produto_dict(p):
+    return {
+        "id": p.id,
+        "codigo_barras": p.codigo_barras,
+        "descricao": p.descricao,
+        "data_cadastro": p.data_cadastro.isoformat()
     }
-    
-    if request.method == 'OPTIONS':
-        return {'statusCode': 200, 'headers': headers, 'body': ''}
-    
-    # Check DATABASE_URL
-    DATABASE_URL = os.getenv("DATABASE_URL")
-    if not DATABASE_URL:
-        return {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({"error": "DATABASE_URL não configurada no Vercel"})
-        }
-    
-    try:
-        from sqlalchemy import create_engine, Column, Integer, String, DateTime
-        from sqlalchemy.ext.declarative import declarative_base
-        from sqlalchemy.orm import sessionmaker
-        
-        if DATABASE_URL.startswith("postgres://"):
-            DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-        
-        engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-        Base = declarative_base()
-        
-        class Produto(Base):
-            __tablename__ = "produtos"
-            id = Column(Integer, primary_key=True, index=True)
-            codigo_barras = Column(String, unique=True, index=True, nullable=False)
-            descricao = Column(String, nullable=False)
-            data_cadastro = Column(DateTime, default=datetime.utcnow)
-        
-        Base.metadata.create_all(bind=engine)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        db = SessionLocal()
 
 def handler(request):
     headers = {
@@ -51,60 +23,51 @@ def handler(request):
         'Access-Control-Allow-Headers': 'Content-Type',
         'Content-Type': 'application/json'
     }
+    inicio = time.perf_counter()
     
     if request.method == 'OPTIONS':
         return {'statusCode': 200, 'headers': headers, 'body': ''}
     
     try:
-        db = get_db()
+        inicio_db = time.perf_counter()
+        from database_vercel import SessionLocal, registrar_tempo
+        db = SessionLocal()
         
         if request.method == 'POST':
             data = json.loads(request.body)
             
-            existing = db.query(Produto).filter(Produto.codigo_barras == data['codigo_barras']).first()
-            if existing:
-                db.close()
+            # Leituras anteriores ao cadastro passam para a nova descrição
+            produto = cadastrar_produto(db, data['codigo_barras'].strip(), data['descricao'].strip())
+            if produto is None:
                 return {
                     'statusCode': 409,
                     'headers': headers,
                     'body': json.dumps({"detail": "Código de barras já cadastrado"})
                 }
-            
-            produto = Produto(
-                codigo_barras=data['codigo_barras'].strip(),
-                descricao=data['descricao'].strip()
-            )
-            db.add(produto)
             db.commit()
-            db.refresh(produto)
-            
-            response = {
-                "id": produto.id,
-                "codigo_barras": produto.codigo_barras,
-                "descricao": produto.descricao,
-                "data_cadastro": produto.data_cadastro.isoformat()
-            }
-            
-            db.close()
-            return {'statusCode': 200, 'headers': headers, 'body': json.dumps(response)}
+            response = _produto_dict(produto)
         
         elif request.method == 'GET':
-            produtos = db.query(Produto).order_by(Produto.data_cadastro.desc()).all()
-            response = [{
-                "id": p.id,
-                "codigo_barras": p.codigo_barras,
-                "descricao": p.descricao,
-                "data_cadastro": p.data_cadastro.isoformat()
-            } for p in produtos]
-            
-            db.close()
-            return {'statusCode': 200, 'headers': headers, 'body': json.dumps(response)}
-            
+            response = [_produto_dict(p) for p in listar_produtos(db)]
+        
+        else:
+            return {
+                'statusCode': 405,
+                'headers': headers,
+                'body': json.dumps({"error": "Método não suportado"})
+            }
+        
+        registrar_tempo(headers, inicio, inicio_db)
+        return {'statusCode': 200, 'headers': headers, 'body': json.dumps(response)}
+        
     except Exception as e:
         if 'db' in locals():
-            db.close()
+            db.rollback()
         return {
             'statusCode': 500,
             'headers': headers,
             'body': json.dumps({"error": str(e)})
-        }
\ No newline at end of file
+        }
+    finally:
+        if 'db' in locals():
+            db.close()
@@ -1,32 +1,12 @@
 import json
 import os
-from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, func
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import sys
+import time
 
-Base = declarative_base()
+# Modelos, engine e consultas vêm da camada compartilhada em backend/
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
-class Leitura(Base):
-    __tablename__ = "leituras"
-    id = Column(Integer, primary_key=True, index=True)
-    codigo_barras = Column(String, index=True)
-    descricao = Column(String, default="Não identificado")
-    quantidade = Column(Integer, default=1)
-    data_hora = Column(DateTime, default=datetime.utcnow)
-
-def get_db():
-    DATABASE_URL = os.getenv("DATABASE_URL")
-    if not DATABASE_URL:
-        raise ValueError("DATABASE_URL não configurada no Vercel")
-    
-    if DATABASE_URL.startswith("postgres://"):
-        DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-    
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-    Base.metadata.create_all(bind=engine)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    return SessionLocal()
+from repository import listar_relatorio
 
 def handler(request):
     headers = {
@@ -35,23 +15,25 @@ def handler(request):
         'Access-Control-Allow-Headers': 'Content-Type',
         'Content-Type': 'application/json'
     }
+    inicio = time.perf_counter()
     
     if request.method == 'OPTIONS':
         return {'statusCode': 200, 'headers': headers, 'body': ''}
     
     try:
-        db = get_db()
+        inicio_db = time.perf_counter()
+        from database_vercel import SessionLocal, registrar_tempo
+        db = SessionLocal()
         
-        result = db.query(
-            Leitura.descricao,
-            func.sum(Leitura.quantidade).label('total_quantidade')
-        ).group_by(Leitura.descricao).order_by(func.sum(Leitura.quantidade).desc()).all()
+        # Tabela agregada mantida pelas gravações (O(produtos distintos))
+        result = listar_relatorio(db)
         
         response = [{
             "descricao": r.descricao,
-            "quantidade": r.total_quantidade
+            "quantidade": r.quantidade
         } for r in result]
         
+        registrar_tempo(headers, inicio, inicio_db)
         return {'statusCode': 200, 'headers': headers, 'body': json.dumps(response)}
         
     except Exception as e:
@@ -62,4 +44,4 @@ def handler(request):
         }
     finally:
         if 'db' in locals():
-            db.close()
\ No newline at end of file
+            db.close()
@@ -1,8 +1,8 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 import sys
 import os
@@ -10,14 +10,26 @@ import os
 # Add backend directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-try:
-    from database_vercel import get_db, Leitura, Produto
-except ImportError:
-    # Fallback for local development
-    from database import get_db, Leitura, Produto
+# Postgres com DATABASE_URL definida (Vercel), SQLite no desenvolvimento local
+from database import get_db, SessionLocal
+
+from catalog_cache import catalogo
+from repository import (
+    registrar_leituras, listar_leituras, listar_relatorio, cadastrar_produto, listar_produtos,
+    inicializar_banco, LIMITE_PADRAO, LIMITE_MAXIMO
+)
 
 app = FastAPI(title="Barcode Reader API")
 
+@app.on_event("startup")
+async def startup():
+    inicializar_banco()
+    db = SessionLocal()
+    try:
+        catalogo.load(db)
+    finally:
+        db.close()
+
 # Handler for Vercel
 def handler(request, context):
     return app(request, context)
@@ -28,6 +40,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 class LeituraResponse(BaseModel):
@@ -52,8 +65,21 @@ class ProdutoResponse(BaseModel):
     data_cadastro: str
 
 @app.get("/api/leituras", response_model=List[LeituraResponse])
-async def get_leituras(db: Session = Depends(get_db)):
-    leituras = db.query(Leitura).order_by(Leitura.data_hora.desc()).all()
+async def get_leituras(
+    response: Response,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    codigo_barras: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_db)
+):
+    try:
+        leituras, proximo = listar_leituras(db, since, until, codigo_barras, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if proximo:
+        response.headers["X-Next-Cursor"] = proximo
     return [
         LeituraResponse(
             id=l.id,
@@ -67,34 +93,24 @@ async def get_leituras(db: Session = Depends(get_db)):
 
 @app.get("/api/relatorio", response_model=List[RelatorioResponse])
 async def get_relatorio(db: Session = Depends(get_db)):
-    from sqlalchemy import func
-    
-    result = db.query(
-        Leitura.descricao,
-        func.sum(Leitura.quantidade).label('total_quantidade')
-    ).group_by(Leitura.descricao).order_by(func.sum(Leitura.quantidade).desc()).all()
+    result = listar_relatorio(db)
     
     return [
         RelatorioResponse(
             descricao=r.descricao,
-            quantidade=r.total_quantidade
+            quantidade=r.quantidade
         )
         for r in result
     ]
 
 @app.post("/api/produtos", response_model=ProdutoResponse)
 async def create_produto(produto: ProdutoCreate, db: Session = Depends(get_db)):
-    existing = db.query(Produto).filter(Produto.codigo_barras == produto.codigo_barras).first()
-    if existing:
+    # Leituras anteriores ao cadastro passam para a nova descrição
+    db_produto = cadastrar_produto(db, produto.codigo_barras.strip(), produto.descricao.strip())
+    if db_produto is None:
         raise HTTPException(status_code=409, detail="Código de barras já cadastrado")
-    
-    db_produto = Produto(
-        codigo_barras=produto.codigo_barras.strip(),
-        descricao=produto.descricao.strip()
-    )
-    db.add(db_produto)
     db.commit()
-    db.refresh(db_produto)
+    catalogo.put(db_produto.codigo_barras, db_produto.descricao)
     
     return ProdutoResponse(
         id=db_produto.id,
@@ -105,7 +121,7 @@ async def create_produto(produto: ProdutoCreate, db: Session = Depends(get_db)):
 
 @app.get("/api/produtos", response_model=List[ProdutoResponse])
 async def get_produtos(db: Session = Depends(get_db)):
-    produtos = db.query(Produto).order_by(Produto.data_cadastro.desc()).all()
+    produtos = listar_produtos(db)
     return [
         ProdutoResponse(
             id=p.id,
@@ -118,25 +134,16 @@ async def get_produtos(db: Session = Depends(get_db)):
 
 @app.post("/api/leituras")
 async def create_leitura(codigo_barras: str, db: Session = Depends(get_db)):
-    produto = db.query(Produto).filter(Produto.codigo_barras == codigo_barras).first()
-    descricao = produto.descricao if produto else "Não identificado"
-    
-    existing = db.query(Leitura).filter(Leitura.codigo_barras == codigo_barras).first()
+    descricao = catalogo.get(codigo_barras, db) or "Não identificado"
     
-    if existing:
-        existing.quantidade += 1
-        existing.data_hora = datetime.utcnow()
-        db.commit()
-        return {"message": "Leitura atualizada"}
-    else:
-        nova_leitura = Leitura(
-            codigo_barras=codigo_barras,
-            descricao=descricao,
-            quantidade=1
-        )
-        db.add(nova_leitura)
-        db.commit()
-        return {"message": "Nova leitura registrada"}
+    registrar_leituras(db, [{
+        "codigo_barras": codigo_barras,
+        "descricao": descricao,
+        "stream_id": None,
+        "data_hora": datetime.utcnow(),
+    }])
+    db.commit()
+    return {"message": "Leitura registrada"}
 
 @app.get("/api")
 async def root():
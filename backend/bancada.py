@@ -0,0 +1,84 @@
+"""Apoio comum aos scripts de teste e benchmark: banco SQLite descartável,
+percentil das latências e execução das funções test_* fora do pytest.
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+_diretorio = None
+
+
+def usar_banco_temporario(prefixo: str = "bancada_") -> str:
+    """Aponta DATABASE_URL para um SQLite num diretório temporário e o retorna.
+
+    Chamar antes de importar `database`: o import não deve tocar no leituras.db
+    real. O diretório é um só por processo (o pytest importa vários testes) e
+    some no fim do processo ou em `descartar_banco_temporario`.
+    """
+    global _diretorio
+    if _diretorio is None:
+        _diretorio = tempfile.mkdtemp(prefix=prefixo)
+        os.environ["DATABASE_URL"] = f"sqlite:///{_diretorio}/teste.db"
+        atexit.register(descartar_banco_temporario)
+    return _diretorio
+
+
+def descartar_banco_temporario():
+    global _diretorio
+    if _diretorio is None:
+        return
+    database = sys.modules.get("database")
+    if database is not None:
+        database.engine.dispose()
+        database.engine_escrita.dispose()
+    shutil.rmtree(_diretorio, ignore_errors=True)
+    _diretorio = None
+
+
+def esvaziar_banco():
+    """Apaga todas as tabelas, para um teste que precisa começar do zero"""
+    import repository
+    from database import engine, engine_escrita
+    from sqlalchemy import inspect, text
+
+    engine_escrita.dispose()
+    with engine.begin() as conn:
+        for tabela in inspect(conn).get_table_names():
+            conn.execute(text(f'DROP TABLE "{tabela}"'))
+    repository._schema_pronto = False
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def rodar_testes(titulo, modulo):
+    """Roda setup_module, as funções test_* na ordem do arquivo e teardown_module"""
+    print(f"=== {titulo} ===")
+    testes = [f for nome, f in vars(modulo).items() if nome.startswith("test_") and callable(f)]
+    falhas = []
+    if hasattr(modulo, "setup_module"):
+        modulo.setup_module()
+    try:
+        for teste in testes:
+            try:
+                teste()
+                print(f"   ✅ {teste.__doc__ or teste.__name__}")
+            except AssertionError as e:
+                print(f"   ❌ {teste.__doc__ or teste.__name__}: {e}")
+                falhas.append(teste.__name__)
+    finally:
+        if hasattr(modulo, "teardown_module"):
+            modulo.teardown_module()
+        descartar_banco_temporario()
+
+    if falhas:
+        print(f"\n❌ TESTE FALHOU! {len(falhas)} verificações")
+        sys.exit(1)
+    print("\n✅ TESTE PASSOU!")
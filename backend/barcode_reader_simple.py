@@ -1,116 +1,308 @@
 import cv2
+import logging
 import threading
 import time
-from pyzbar import pyzbar
-from sqlalchemy.orm import Session
-from database import SessionLocal, Leitura
+from collections import deque
+from concurrent import futures
 from datetime import datetime
+from captura import abrir_captura, descrever_captura
+from frame_buffer import FrameBuffer
+from decode_pool import TIMEOUT_DECODIFICACAO, DecodePool, decodificar_codigos
+from persistence import leitura_writer
+from catalog_cache import catalogo
+from live_feed import live_feed
+from metricas import MetricasStream
+from logs import obter_logger
+from preprocess import recortar_roi, MotionGate
+
+log = obter_logger("captura")
 
 class BarcodeReader:
-    def __init__(self):
+    def __init__(self, stream_id: str = None, pool: DecodePool = None):
+        self.stream_id = stream_id
         self.stream_url = None
         self.is_reading = False
         self.thread = None
+        self.grab_thread = None
+        self.buffer = None
+        self.pool = None
+        self._pool_compartilhado = pool  # pool de outro dono (ex.: StreamManager), não é fechado aqui
+        self.codigos_ativos = set()  # Estado atual dos códigos visíveis
+        self.roi = None
+        self.pyramid_levels = 0
+        self.motion_gate = None
+        self.frames_processados = 0
+        self.ultima_latencia = None  # segundos entre captura e fim da decodificação
+        self.replay_speed = None
+        self.fonte_encerrada = False
+        self.tempos_decodificacao = None  # só no replay: segundos por frame decodificado
+        self.entradas_registradas = 0
+        self.opcoes_captura = {}
+        self.info_captura = None
+        self.metricas = MetricasStream(stream_id)
         
-    def start_reading(self, stream_url: str):
+    def start_reading(self, stream_url: str, buffer_size: int = 2, max_frame_age: float = 0.5,
+                      decode_workers: int = 0, roi=None, pyramid_levels: int = 0,
+                      skip_identical: bool = False, motion_gate: bool = False,
+                      motion_threshold: int = 8, motion_min_area: float = 0.002,
+                      motion_max_interval: float = 5.0, replay_speed: float = None,
+                      fps_imagens: float = 30.0, captura: dict = None):
+        """Inicia a leitura de uma câmera ao vivo ou, com `replay_speed`, de um
+        vídeo/pasta de imagens local: 0 processa o mais rápido possível, N
+        reproduz a N vezes o tempo real. No replay nenhum frame é descartado
+        e a leitura termina sozinha no fim do arquivo. `captura` são as opções
+        de `abrir_captura` (backend, buffer, transporte, fps, resolucao, cinza,
+        aceleracao)."""
         if self.is_reading:
             self.stop_reading()
         
         self.stream_url = stream_url
         self.is_reading = True
+        self.replay_speed = replay_speed
+        self.fps_imagens = fps_imagens
+        self.opcoes_captura = dict(captura or {})
+        self.info_captura = None
+        self.fonte_encerrada = False
+        if replay_speed is not None:
+            self.buffer = FrameBuffer(capacidade=buffer_size, bloqueante=True,
+                                      contador_descartes=self.metricas.frames_descartados)
+        else:
+            self.buffer = FrameBuffer(capacidade=buffer_size, idade_maxima=max_frame_age,
+                                      contador_descartes=self.metricas.frames_descartados)
+        # decode_workers=0 decodifica na própria thread de leitura
+        if self._pool_compartilhado:
+            self.pool = self._pool_compartilhado
+        else:
+            self.pool = DecodePool(workers=decode_workers) if decode_workers > 0 else None
+        self.codigos_ativos = set()
+        # Pré-processamento: recorte fixo, pirâmide e descarte de frames sem mudança
+        self.roi = roi
+        self.pyramid_levels = pyramid_levels
+        if motion_gate:
+            self.motion_gate = MotionGate(motion_threshold, motion_min_area, motion_max_interval)
+        elif skip_identical:
+            self.motion_gate = MotionGate(limiar=0, fracao_minima=0, intervalo_maximo=None)
+        else:
+            self.motion_gate = None
+        self.frames_processados = 0
+        self.ultima_latencia = None
+        self.tempos_decodificacao = [] if replay_speed is not None else None
+        self.entradas_registradas = 0
         self.thread = threading.Thread(target=self._read_stream)
         self.thread.daemon = True
         self.thread.start()
     
     def stop_reading(self):
         self.is_reading = False
+        if self.buffer:
+            self.buffer.fechar()
         if self.thread:
             self.thread.join()
+        # Garantir que as entradas já detectadas cheguem ao banco
+        leitura_writer.flush(timeout=5)
+    
+    def get_stats(self):
+        buffer = self.buffer
+        pool = self.pool
+        return {
+            "stream_id": self.stream_id,
+            "ativo": self.is_reading,
+            "url": self.stream_url,
+            "frames_capturados": buffer.recebidos if buffer is not None else 0,
+            "frames_descartados": buffer.descartados if buffer is not None else 0,
+            "frames_processados": self.frames_processados,
+            "entradas_registradas": self.entradas_registradas,
+            "frames_ignorados": self.motion_gate.ignorados if self.motion_gate else 0,
+            "frames_liberados": self.motion_gate.liberados if self.motion_gate else None,
+            "frames_em_espera": len(buffer) if buffer is not None else 0,
+            "decode_workers": pool.workers if pool else 0,
+            "decode_reinicios": pool.reinicios if pool else 0,
+            "frames_inline": pool.frames_inline if pool else 0,
+            "captura": self.info_captura,
+            "latencia_ms": round(self.ultima_latencia * 1000, 1) if self.ultima_latencia is not None else None,
+            "persistencia": leitura_writer.get_stats(),
+        }
+    
+    def _grab_stream(self, cap):
+        """Produtor: lê o VideoCapture continuamente e mantém só os frames recentes"""
+        frame_id = 0
+        intervalo = 1.0 / ((cap.get(cv2.CAP_PROP_FPS) or 30.0) * self.replay_speed) if self.replay_speed else 0
+        # FPS alvo que a câmera não negociou: os frames extras só passam por grab()
+        fps_alvo = self.opcoes_captura.get("fps") if self.replay_speed is None else None
+        intervalo_minimo = 1.0 / fps_alvo if fps_alvo else 0
+        proxima_leitura = 0.0
+        inicio = time.monotonic()
+        metrica_captura = self.metricas.captura
+        while self.is_reading:
+            if intervalo_minimo and time.monotonic() < proxima_leitura:
+                # Avança o stream sem a conversão de cor do retrieve()
+                if not cap.grab():
+                    time.sleep(0.1)
+                continue
+            
+            lido_em = time.perf_counter()
+            ret, frame = cap.read()
+            duracao_leitura = time.perf_counter() - lido_em  # antes do ritmo do replay
+            if not ret:
+                if self.replay_speed is not None:
+                    # Fim do arquivo: o consumidor esvazia o buffer e encerra
+                    self.fonte_encerrada = True
+                    self.buffer.fechar()
+                    return
+                time.sleep(0.1)
+                continue
+            
+            if intervalo:
+                espera = inicio + frame_id * intervalo - time.monotonic()
+                if espera > 0:
+                    time.sleep(espera)
+            metrica_captura.observe(duracao_leitura)
+            if intervalo_minimo:
+                proxima_leitura = time.monotonic() + intervalo_minimo
+            frame_id += 1
+            self.buffer.put(frame_id, time.monotonic(), frame)
     
     def _read_stream(self):
-        print(f"🎥 Conectando ao stream: {self.stream_url}")
-        cap = cv2.VideoCapture(self.stream_url)
+        extra = {"stream_id": self.stream_id}
+        log.info("🎥 Conectando ao stream: %s", self.stream_url, extra=extra)
+        cap = abrir_captura(self.stream_url, self.fps_imagens, replay=self.replay_speed is not None,
+                            **self.opcoes_captura)
         
         if not cap.isOpened():
-            print(f"❌ Erro ao abrir stream: {self.stream_url}")
+            log.error("❌ Erro ao abrir stream: %s", self.stream_url, extra=extra)
+            self.is_reading = False
+            self._fechar_pool()
             return
         
-        print("✅ Stream conectado! Iniciando controle de estado...")
-        codigos_ativos = set()  # Estado atual dos códigos visíveis
-        frame_count = 0
+        self.info_captura = descrever_captura(cap)
+        log.info("✅ Stream conectado (%s)! Iniciando controle de estado...", self.info_captura["backend"],
+                 extra=dict(extra, **self.info_captura))
+        largura, altura = self.info_captura["largura"], self.info_captura["altura"]
+        if self.roi and largura and altura and (
+                self.roi[0] + self.roi[2] > largura or self.roi[1] + self.roi[3] > altura):
+            log.warning("⚠️ ROI %s excede o frame %sx%s; recortando na borda", self.roi, largura, altura,
+                        extra=extra)
+        self.grab_thread = threading.Thread(target=self._grab_stream, args=(cap,))
+        self.grab_thread.daemon = True
+        self.grab_thread.start()
+        
+        pendentes = deque()  # (frame, capturado_em, enviado_em, Future) na ordem dos frames
         
         while self.is_reading:
-            ret, frame = cap.read()
-            if not ret:
-                time.sleep(0.1)
+            # Entregar resultados do pool em ordem; bloqueia no mais antigo se o pool está cheio
+            while pendentes and (pendentes[0][3].done() or len(pendentes) >= self.pool.workers):
+                self._entregar(*pendentes.popleft())
+            
+            item = self.buffer.get(timeout=0.005 if pendentes else 0.5)
+            if item is None:
+                if self.buffer.fechado:
+                    break
                 continue
             
-            frame_count += 1
-            codigos_detectados_agora = set()
+            frame_count, capturado_em, frame = item
             
             try:
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                barcodes = pyzbar.decode(gray)
-                
-                # Coletar todos os códigos detectados neste frame
-                for barcode in barcodes:
-                    codigo = barcode.data.decode('utf-8')
-                    codigos_detectados_agora.add(codigo)
-                
+                convertido_em = time.perf_counter()
+                # Com o pipeline GRAY8 o frame já chega em cinza
+                gray = recortar_roi(frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), self.roi)
+                self.metricas.conversao.observe(time.perf_counter() - convertido_em)
+                if self.motion_gate and not self.motion_gate.deve_decodificar(gray):
+                    # Cena sem mudança: os códigos ativos continuam válidos
+                    continue
+                enviado_em = time.perf_counter()
+                if self.pool:
+                    pendentes.append((frame_count, capturado_em, enviado_em, self.pool.submit(gray, self.pyramid_levels)))
+                    continue
+                codigos = decodificar_codigos(gray, self.pyramid_levels)
             except Exception as e:
-                print(f"❌ Erro no frame {frame_count}: {e}")
+                log.warning("❌ Erro no frame %s: %s", frame_count, e, extra=extra)
                 continue
             
-            # DEBUG: Log do estado atual
-            if frame_count % 30 == 0 or codigos_detectados_agora != codigos_ativos:
-                print(f"📊 Frame {frame_count} | Ativos: {codigos_ativos} | Detectados: {codigos_detectados_agora}")
-            
-            # PROCESSAR APENAS NOVAS ENTRADAS (não estavam ativos)
-            novas_entradas = codigos_detectados_agora - codigos_ativos
-            for codigo in novas_entradas:
-                print(f"🎆 REGISTRANDO ENTRADA: {codigo} (frame {frame_count})")
-                self._save_barcode(codigo)
-            
-            # Log de saídas (estavam ativos, mas não detectados agora)
-            saidas = codigos_ativos - codigos_detectados_agora
-            for codigo in saidas:
-                print(f"🚪 SAÍDA DETECTADA: {codigo} (frame {frame_count})")
-            
-            # ATUALIZAR ESTADO: substituir completamente pelos códigos atuais
-            codigos_ativos = codigos_detectados_agora.copy()
-            
-            time.sleep(0.05)  # Reduzir intervalo para melhor responsividade
+            self._registrar_decodificacao(time.perf_counter() - enviado_em)
+            self._atualizar_estado(frame_count, capturado_em, set(codigos))
+        
+        if self.fonte_encerrada:
+            # Replay: os frames que ainda estão no pool também contam
+            while pendentes:
+                self._entregar(*pendentes.popleft())
+            self.is_reading = False
+            log.info("🏁 Fim do arquivo: %s frames processados", self.frames_processados, extra=extra)
         
-        print("🛑 Encerrando captura...")
+        log.info("🛑 Encerrando captura...", extra=extra)
+        self.grab_thread.join()
         cap.release()
+        self._fechar_pool()
     
-    def _save_barcode(self, codigo_barras: str):
-        """Registra código APENAS na primeira detecção (entrada)"""
-        from database import Produto
-        db = SessionLocal()
+    def _entregar(self, frame_count, capturado_em, enviado_em, futuro):
+        """Consome o resultado de um frame decodificado no pool"""
         try:
-            # Buscar descrição cadastrada
-            produto = db.query(Produto).filter(Produto.codigo_barras == codigo_barras).first()
-            descricao = produto.descricao if produto else "Não identificado"
-            
-            existing = db.query(Leitura).filter(Leitura.codigo_barras == codigo_barras).first()
-            
-            if existing:
-                existing.quantidade += 1
-                existing.data_hora = datetime.utcnow()
-                existing.descricao = descricao  # Atualizar descrição
-                print(f"💾 Atualizado: {codigo_barras} ({descricao}) -> Quantidade: {existing.quantidade}")
-            else:
-                leitura = Leitura(codigo_barras=codigo_barras, descricao=descricao)
-                db.add(leitura)
-                print(f"🆕 Novo registro: {codigo_barras} ({descricao}) -> Quantidade: 1")
-            
-            db.commit()
-            print(f"✅ Salvo no banco: {codigo_barras}")
+            codigos = futuro.result(timeout=TIMEOUT_DECODIFICACAO)
+        except futures.TimeoutError:
+            futuro.cancel()  # o pool recria o worker travado e recupera o slot
+            log.warning("⏱️ Frame %s sem resposta do pool em %.0f s", frame_count, TIMEOUT_DECODIFICACAO,
+                        extra={"stream_id": self.stream_id})
+            return
         except Exception as e:
-            print(f"❌ Erro ao salvar {codigo_barras}: {e}")
-            db.rollback()
-        finally:
-            db.close()
+            log.warning("❌ Erro no frame %s: %s", frame_count, e, extra={"stream_id": self.stream_id})
+            return
+        # Com o pool, inclui a espera na fila
+        self._registrar_decodificacao(time.perf_counter() - enviado_em)
+        self._atualizar_estado(frame_count, capturado_em, set(codigos))
+    
+    def _registrar_decodificacao(self, duracao: float):
+        self.metricas.decodificacao.observe(duracao)
+        if self.tempos_decodificacao is not None:
+            self.tempos_decodificacao.append(duracao)
+    
+    def _fechar_pool(self):
+        pool, self.pool = self.pool, None
+        if pool and pool is not self._pool_compartilhado:
+            pool.close()
+    
+    def _atualizar_estado(self, frame_count: int, capturado_em: float, codigos_detectados_agora: set):
+        """Controle de entrada/saída a partir dos códigos de um frame"""
+        inicio = time.perf_counter()
+        codigos_ativos = self.codigos_ativos
+        self.frames_processados += 1
+        self.metricas.frames_processados.inc()
+        self.ultima_latencia = time.monotonic() - capturado_em
+        
+        # DEBUG: Log do estado atual (ligado em tempo de execução por POST /logs/debug)
+        if log.isEnabledFor(logging.DEBUG) and (
+                self.frames_processados % 30 == 0 or codigos_detectados_agora != codigos_ativos):
+            log.debug("📊 Frame %s | Ativos: %s | Detectados: %s | Descartados: %s",
+                      frame_count, codigos_ativos, codigos_detectados_agora, self.buffer.descartados,
+                      extra={"stream_id": self.stream_id, "frame": frame_count})
+        
+        # PROCESSAR APENAS NOVAS ENTRADAS (não estavam ativos)
+        novas_entradas = codigos_detectados_agora - codigos_ativos
+        for codigo in novas_entradas:
+            log.info("🎆 REGISTRANDO ENTRADA: %s (frame %s)", codigo, frame_count,
+                     extra={"stream_id": self.stream_id, "codigo_barras": codigo, "frame": frame_count})
+            agora = datetime.utcnow()
+            leitura_writer.submit(codigo, data_hora=agora, stream_id=self.stream_id, capturado_em=capturado_em)
+            self.entradas_registradas += 1
+            self.metricas.codigos_detectados.inc()
+            self._publicar("entrada", codigo, agora)
+        
+        # Log de saídas (estavam ativos, mas não detectados agora)
+        saidas = codigos_ativos - codigos_detectados_agora
+        for codigo in saidas:
+            log.info("🚪 SAÍDA DETECTADA: %s (frame %s)", codigo, frame_count,
+                     extra={"stream_id": self.stream_id, "codigo_barras": codigo, "frame": frame_count})
+            self._publicar("saida", codigo, datetime.utcnow())
+        
+        # ATUALIZAR ESTADO: substituir completamente pelos códigos atuais
+        self.codigos_ativos = codigos_detectados_agora.copy()
+        self.metricas.estado.observe(time.perf_counter() - inicio)
 
-barcode_reader = BarcodeReader()
\ No newline at end of file
+    def _publicar(self, tipo: str, codigo: str, data_hora: datetime):
+        """Envia o evento para os dashboards conectados no feed ao vivo"""
+        live_feed.publish({
+            "tipo": tipo,
+            "codigo_barras": codigo,
+            "descricao": catalogo.peek(codigo),
+            "stream_id": self.stream_id,
+            "data_hora": data_hora.isoformat(),
+            "ocorrencias": 1,
+        })
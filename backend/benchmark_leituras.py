@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Benchmark da serialização das listagens: caminho antigo (Pydantic +
+response_model + JSONResponse) contra o caminho rápido (tuplas -> bytes).
+
+Uso: python benchmark_leituras.py [--linhas 100000] [--repeticoes 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bancada import descartar_banco_temporario, usar_banco_temporario
+
+usar_banco_temporario("bench_leituras_")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from database import SessionLocal
+from repository import _produtos, inicializar_banco, listar_produtos
+from serializacao import linhas_json, orjson
+
+
+class ProdutoResponse(BaseModel):
+    """Mesmo modelo de main.py (sem importar o app e suas dependências de vídeo)"""
+    id: int
+    codigo_barras: str
+    descricao: str
+    data_cadastro: str
+
+
+def _caminho_antigo(produtos):
+    """Como get_produtos fazia: modelo por linha e nova validação pelo response_model"""
+    modelos = [
+        ProdutoResponse(
+            id=p.id,
+            codigo_barras=p.codigo_barras,
+            descricao=p.descricao,
+            data_cadastro=p.data_cadastro.isoformat()
+        )
+        for p in produtos
+    ]
+    validados = TypeAdapter(List[ProdutoResponse]).validate_python(modelos, from_attributes=True)
+    return JSONResponse(jsonable_encoder(validados)).body
+
+
+def _medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=100000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        _comparar(args.linhas, args.repeticoes)
+    finally:
+        descartar_banco_temporario()
+
+
+def _comparar(linhas, repeticoes):
+    inicializar_banco()
+    inicio = datetime(2026, 1, 1)
+    with SessionLocal() as db:
+        db.execute(_produtos.insert(), [
+            {
+                "codigo_barras": f"789{i:010d}",
+                "descricao": f"Produto {i} – ação",
+                "data_cadastro": inicio + timedelta(seconds=i, microseconds=(i * 7919) % 1000000),
+            }
+            for i in range(linhas)
+        ])
+        db.commit()
+        produtos = listar_produtos(db)
+
+    print(f"=== BENCHMARK LISTAGEM: {linhas} produtos ===")
+    print(f"Encoder rápido: {'orjson' if orjson else 'json (fallback)'}")
+    antigo_ms, antigo = _medir(lambda: _caminho_antigo(produtos), repeticoes)
+    novo_ms, novo = _medir(lambda: linhas_json(produtos), repeticoes)
+
+    print(f"📊 Caminho antigo: {antigo_ms:.1f} ms")
+    print(f"📊 Caminho rápido: {novo_ms:.1f} ms ({antigo_ms / novo_ms:.1f}x)")
+    print(f"{'✅' if antigo == novo else '❌'} Respostas idênticas byte a byte: {antigo == novo}")
+
+
+if __name__ == "__main__":
+    main()
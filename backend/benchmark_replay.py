@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Replay offline: passa um vídeo gravado (ou uma pasta de imagens) pelo
+pipeline completo do BarcodeReader e mede o desempenho.
+
+Captura, pré-processamento, decodificação, controle de entrada/saída e
+persistência rodam como com a câmera, mas sem descartar frames. Por padrão
+grava num banco temporário; use --banco para apontar outro. Com o gabarito
+de um vídeo de `gerador_sintetico.py`, também mede a acurácia da contagem.
+
+Uso: python benchmark_replay.py VIDEO_OU_PASTA [--velocidade 0] [--workers 0]
+     [--pyramid 0] [--motion-gate] [--backend auto] [--cinza] [--gabarito video.gabarito.json]
+     [--json resultado.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bancada import descartar_banco_temporario, percentil, usar_banco_temporario
+
+_PARSER = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+_PARSER.add_argument("origem", help="arquivo de vídeo ou pasta de imagens")
+_PARSER.add_argument("--velocidade", type=float, default=0,
+                     help="0 = o mais rápido possível; N = N vezes o tempo real")
+_PARSER.add_argument("--workers", type=int, default=0, help="processos de decodificação (0 = inline)")
+_PARSER.add_argument("--pyramid", type=int, default=0)
+_PARSER.add_argument("--motion-gate", action="store_true")
+_PARSER.add_argument("--roi", type=int, nargs=4, metavar=("X", "Y", "W", "H"))
+_PARSER.add_argument("--backend", choices=("auto", "ffmpeg", "gstreamer"), default="auto")
+_PARSER.add_argument("--cinza", action="store_true", help="decodificar direto em cinza (sem cvtColor)")
+_PARSER.add_argument("--aceleracao", action="store_true", help="decodificação de vídeo por hardware, se houver")
+_PARSER.add_argument("--fps-imagens", type=float, default=30.0, help="fps assumido para pastas de imagens")
+_PARSER.add_argument("--banco", help="DATABASE_URL; padrão: SQLite temporário")
+_PARSER.add_argument("--gabarito", help="gabarito JSON do gerador_sintetico.py, para medir a acurácia")
+_PARSER.add_argument("--json", help="salva o resultado neste arquivo")
+
+# O banco precisa estar definido antes do import de database, que cria a engine.
+# Só no processo principal: os workers (spawn) reimportam este módulo
+if __name__ == "__main__":
+    _args = _PARSER.parse_args()
+    if _args.banco:
+        os.environ["DATABASE_URL"] = _args.banco
+    else:
+        usar_banco_temporario("replay_")
+
+from sqlalchemy import func
+
+from barcode_reader_simple import BarcodeReader
+from decode_pool import DecodePool
+from database import LeituraEvento, SessionLocal
+from persistence import leitura_writer
+from repository import inicializar_banco
+
+
+def _deteccoes(stream_id):
+    db = SessionLocal()
+    try:
+        linhas = (
+            db.query(LeituraEvento.codigo_barras, func.count())
+            .filter(LeituraEvento.stream_id == stream_id)
+            .group_by(LeituraEvento.codigo_barras)
+            .all()
+        )
+        return {codigo: total for codigo, total in linhas}
+    finally:
+        db.close()
+
+
+def executar(origem, velocidade=0.0, workers=0, pyramid=0, motion_gate=False, roi=None,
+             fps_imagens=30.0, stream_id="replay", captura=None):
+    """Roda o replay até o fim do arquivo e retorna as métricas.
+
+    O pool de decodificação sobe e é aquecido antes do cronômetro: o tempo
+    de spawn dos workers sai em `inicializacao_pool_s`, fora de `duracao_s`.
+    """
+    inicializar_banco()
+    pool, inicializacao = None, 0.0
+    if workers > 0:
+        inicio = time.perf_counter()
+        pool = DecodePool(workers=workers)
+        vazio = np.zeros((16, 16), dtype=np.uint8)
+        for futuro in [pool.submit(vazio) for _ in range(workers)]:
+            futuro.result()
+        inicializacao = time.perf_counter() - inicio
+
+    leitor = BarcodeReader(stream_id=stream_id, pool=pool)
+    try:
+        inicio = time.perf_counter()
+        leitor.start_reading(
+            origem, buffer_size=8, decode_workers=workers, roi=roi, pyramid_levels=pyramid,
+            motion_gate=motion_gate, replay_speed=velocidade, fps_imagens=fps_imagens, captura=captura,
+        )
+        leitor.thread.join()
+        duracao = time.perf_counter() - inicio
+        leitor.stop_reading()
+        leitura_writer.flush(timeout=30)
+        estatisticas = leitor.get_stats()
+    finally:
+        if pool:
+            pool.close()
+
+    tempos_ms = [t * 1000 for t in leitor.tempos_decodificacao or []]
+    return {
+        "origem": origem,
+        "velocidade": velocidade,
+        "decode_workers": workers,
+        "pyramid_levels": pyramid,
+        "motion_gate": motion_gate,
+        "captura": dict(captura or {}, **(estatisticas["captura"] or {})),
+        "duracao_s": round(duracao, 3),
+        "inicializacao_pool_s": round(inicializacao, 3),
+        "frames": estatisticas["frames_capturados"],
+        "frames_processados": estatisticas["frames_processados"],
+        "frames_ignorados": estatisticas["frames_ignorados"],
+        "frames_descartados": estatisticas["frames_descartados"],
+        "fps": round(estatisticas["frames_capturados"] / duracao, 1) if duracao else None,
+        "decodificacao_ms": {
+            "p50": round(statistics.median(tempos_ms), 2) if tempos_ms else None,
+            "p99": round(percentil(tempos_ms, 0.99), 2) if tempos_ms else None,
+            "max": round(max(tempos_ms), 2) if tempos_ms else None,
+        },
+        "entradas": estatisticas["entradas_registradas"],
+        "gravadas": leitura_writer.get_stats()["gravados"],
+        "deteccoes": _deteccoes(stream_id),
+    }
+
+
+def main():
+    args = _args
+    if not os.path.exists(args.origem):
+        _PARSER.error(f"origem não encontrada: {args.origem}")
+    gabarito = None
+    if args.gabarito:
+        with open(args.gabarito, encoding="utf-8") as arquivo:
+            gabarito = json.load(arquivo)
+        args.fps_imagens = gabarito.get("fps", args.fps_imagens)
+
+    print("=== REPLAY OFFLINE DO PIPELINE ===")
+    try:
+        resultado = executar(
+            args.origem, args.velocidade, args.workers, args.pyramid, args.motion_gate,
+            tuple(args.roi) if args.roi else None, args.fps_imagens,
+            captura={"backend": args.backend, "cinza": args.cinza, "aceleracao": args.aceleracao},
+        )
+        leitura_writer.stop()
+    finally:
+        descartar_banco_temporario()
+
+    decodificacao = resultado["decodificacao_ms"]
+    print(f"📊 Replay de {resultado['origem']} ({resultado['captura'].get('backend')}):")
+    print(f"   Frames: {resultado['frames']} em {resultado['duracao_s']:.2f} s ({resultado['fps']} fps)")
+    if resultado["decode_workers"]:
+        print(f"   Pool de {resultado['decode_workers']} workers pronto em {resultado['inicializacao_pool_s']:.2f} s "
+              f"(fora da duração)")
+    print(f"   Processados: {resultado['frames_processados']} | Ignorados: {resultado['frames_ignorados']} | "
+          f"Descartados: {resultado['frames_descartados']}")
+    if decodificacao["p50"] is not None:
+        print(f"   Decodificação: p50 {decodificacao['p50']:.2f} ms | p99 {decodificacao['p99']:.2f} ms")
+    print(f"   Entradas: {resultado['entradas']} | Gravadas no banco: {resultado['gravadas']}")
+    if gabarito is None:
+        for codigo, total in sorted(resultado["deteccoes"].items()):
+            print(f"   🏷️ {codigo}: {total}")
+    else:
+        from gerador_sintetico import avaliar
+
+        acuracia = resultado["acuracia"] = avaliar(gabarito, resultado["deteccoes"])
+        print(f"🎯 Acurácia da contagem: {acuracia['acertos']}/{acuracia['esperadas']} esperadas | "
+              f"Faltas: {acuracia['faltas']} | Extras: {acuracia['extras']}")
+        print(f"   Precisão: {acuracia['precisao']} | Recall: {acuracia['recall']}")
+        for divergencia in acuracia["divergencias"][:20]:
+            print(f"   ⚠️ {divergencia['codigo_barras']}: esperado {divergencia['esperado']}, "
+                  f"contado {divergencia['contado']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+        print(f"💾 Resultado salvo em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Benchmark do SQLite local: gravações por segundo e latência das leituras
+enquanto a fila de gravação está ativa, no perfil padrão e no perfil WAL.
+
+Uso: python benchmark_sqlite.py [--segundos 5] [--leitores 4] [--lote 50]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bancada import descartar_banco_temporario, percentil, usar_banco_temporario
+
+_TMP = usar_banco_temporario("bench_sqlite_")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, criar_engine
+from repository import listar_leituras, listar_relatorio, registrar_leituras
+
+
+def _perfil_padrao(url):
+    """Como era antes: journal em modo DELETE e um pool para tudo"""
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    return engine, engine
+
+
+def _perfil_wal(url):
+    """WAL + pragmas, uma conexão de escrita e um pool somente leitura"""
+    return criar_engine(url, conexao_unica=True), criar_engine(url, somente_leitura=True)
+
+
+def executar(nome, perfil, segundos, leitores, lote):
+    url = f"sqlite:///{_TMP}/{nome}.db"
+    escrita, leitura = perfil(url)
+    Base.metadata.create_all(bind=escrita)
+    SessaoEscrita = sessionmaker(bind=escrita)
+    SessaoLeitura = sessionmaker(bind=leitura)
+
+    fim = time.monotonic() + segundos
+    gravados = [0]
+    latencias = []
+    erros = [0]
+    lock = threading.Lock()
+
+    def escritor():
+        while time.monotonic() < fim:
+            db = SessaoEscrita()
+            try:
+                registrar_leituras(db, [
+                    {
+                        "codigo_barras": f"789{random.randint(0, 499):010d}",
+                        "descricao": f"Produto {random.randint(0, 49)}",
+                        "stream_id": "bench",
+                        "data_hora": datetime.utcnow(),
+                    }
+                    for _ in range(lote)
+                ])
+                db.commit()
+                gravados[0] += lote
+            except Exception:
+                db.rollback()
+                erros[0] += 1
+            finally:
+                db.close()
+
+    def leitor():
+        while time.monotonic() < fim:
+            inicio = time.perf_counter()
+            db = SessaoLeitura()
+            try:
+                listar_leituras(db, limit=100)
+                listar_relatorio(db)
+            except Exception:
+                with lock:
+                    erros[0] += 1
+                continue
+            finally:
+                db.close()
+            with lock:
+                latencias.append((time.perf_counter() - inicio) * 1000)
+
+    threads = [threading.Thread(target=escritor)] + [threading.Thread(target=leitor) for _ in range(leitores)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    escrita.dispose()
+    leitura.dispose()
+
+    print(f"📊 Perfil {nome}:")
+    print(f"   Gravações/s: {gravados[0] / segundos:.0f}")
+    print(f"   Leituras/s: {len(latencias) / segundos:.0f}")
+    if latencias:
+        print(f"   Latência de leitura: p50 {statistics.median(latencias):.2f} ms | "
+              f"p99 {percentil(latencias, 0.99):.2f} ms")
+    print(f"   Erros (ex.: database is locked): {erros[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segundos", type=float, default=5)
+    parser.add_argument("--leitores", type=int, default=4)
+    parser.add_argument("--lote", type=int, default=50)
+    args = parser.parse_args()
+
+    print("=== BENCHMARK SQLITE: ESCRITA CONCORRENTE COM LEITURAS ===")
+    try:
+        for nome, perfil in (("padrao", _perfil_padrao), ("wal", _perfil_wal)):
+            executar(nome, perfil, args.segundos, args.leitores, args.lote)
+    finally:
+        descartar_banco_temporario()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import os
+import threading
+
+import cv2
+
+from logs import obter_logger
+
+log = obter_logger("captura")
+
+EXTENSOES_IMAGEM = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+BACKENDS = ("auto", "ffmpeg", "gstreamer")
+TRANSPORTES = ("tcp", "udp")
+
+# OPENCV_FFMPEG_CAPTURE_OPTIONS é global do processo e lida na abertura
+_lock_ffmpeg = threading.Lock()
+
+
+class DiretorioImagens:
+    """Pasta de imagens lida como se fosse um vídeo, em ordem alfabética.
+
+    Imita a parte do `cv2.VideoCapture` que o leitor usa (`isOpened`, `read`,
+    `grab`, `get` e `release`), para o replay de frames exportados. Com
+    `cinza`, as imagens já são decodificadas em escala de cinza.
+    """
+
+    def __init__(self, pasta: str, fps: float = 30.0, cinza: bool = False):
+        self.pasta = pasta
+        self.fps = fps
+        self.modo = cv2.IMREAD_GRAYSCALE if cinza else cv2.IMREAD_COLOR
+        self._arquivos = sorted(
+            os.path.join(pasta, nome) for nome in os.listdir(pasta)
+            if nome.lower().endswith(EXTENSOES_IMAGEM)
+        )
+        self._proximo = 0
+
+    def isOpened(self) -> bool:
+        return bool(self._arquivos)
+
+    def read(self):
+        while self._proximo < len(self._arquivos):
+            frame = cv2.imread(self._arquivos[self._proximo], self.modo)
+            self._proximo += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def grab(self) -> bool:
+        self._proximo += 1
+        return self._proximo <= len(self._arquivos)
+
+    def getBackendName(self) -> str:
+        return "IMAGENS"
+
+    def get(self, propriedade):
+        if propriedade == cv2.CAP_PROP_FPS:
+            return self.fps
+        if propriedade == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self._arquivos)
+        return 0
+
+    def release(self):
+        self._arquivos = []
+
+
+def gstreamer_disponivel() -> bool:
+    return cv2.videoio_registry.hasBackend(cv2.CAP_GSTREAMER)
+
+
+def pipeline_gstreamer(origem: str, buffer: int = None, transporte: str = None, fps: float = None,
+                       resolucao=None, cinza: bool = False, replay: bool = False) -> str:
+    """Pipeline GStreamer terminando num appsink que só guarda os frames recentes.
+
+    No `replay` o appsink bloqueia (drop=false) e não há videorate: nenhum
+    frame do arquivo pode ser descartado.
+
+    Com `cinza`, o caps final é GRAY8: o videoconvert extrai o plano Y direto
+    do YUV decodificado e o leitor pula o cvtColor. O `decodebin` usa um
+    decodificador de hardware se houver plugin instalado, ou o de CPU.
+    """
+    if "!" in origem:
+        return origem  # pipeline completo passado pelo usuário
+
+    if origem.startswith("rtsp://"):
+        protocolo = f" protocols={transporte}" if transporte else ""
+        fonte = f'rtspsrc location="{origem}" latency=0{protocolo}'
+    elif origem.startswith(("http://", "https://")):
+        fonte = f'souphttpsrc location="{origem}" is-live=true'
+    elif origem.isdigit() or origem.startswith("/dev/video"):
+        dispositivo = f"/dev/video{origem}" if origem.isdigit() else origem
+        fonte = f"v4l2src device={dispositivo}"
+    else:
+        fonte = f'filesrc location="{origem}"'
+
+    etapas = [fonte, "decodebin", "videoconvert"]
+    caps = [f"video/x-raw,format={'GRAY8' if cinza else 'BGR'}"]
+    if resolucao:
+        etapas.append("videoscale")
+        caps.append(f"width={resolucao[0]},height={resolucao[1]}")
+    if fps and not replay:
+        etapas.append("videorate drop-only=true")
+        caps.append(f"framerate={int(fps)}/1")
+    etapas.append(",".join(caps))
+    etapas.append(f"appsink drop={'false' if replay else 'true'} max-buffers={buffer or 1} sync=false")
+    return " ! ".join(etapas)
+
+
+def _abrir_ffmpeg(origem: str, transporte: str = None, aceleracao: bool = False, backend: int = cv2.CAP_FFMPEG):
+    parametros = []
+    if aceleracao:
+        # Usa decodificação por hardware se existir; senão, segue na CPU
+        parametros += [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+
+    with _lock_ffmpeg:
+        anterior = os.environ.get("OPENCV_FFMPEG_CAPTURE_OPTIONS")
+        if transporte:
+            os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = f"rtsp_transport;{transporte}"
+        try:
+            return cv2.VideoCapture(origem, backend, parametros) if parametros else cv2.VideoCapture(origem, backend)
+        finally:
+            if transporte:
+                if anterior is None:
+                    os.environ.pop("OPENCV_FFMPEG_CAPTURE_OPTIONS", None)
+                else:
+                    os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = anterior
+
+
+def abrir_captura(origem: str, fps_imagens: float = 30.0, backend: str = "auto", buffer: int = None,
+                  transporte: str = None, fps: float = None, resolucao=None, cinza: bool = False,
+                  aceleracao: bool = False, replay: bool = False):
+    """Abre a câmera, o vídeo ou a pasta de imagens com as opções de captura.
+
+    `backend="auto"` mantém a escolha do OpenCV, a não ser que `cinza` peça
+    o pipeline GStreamer (quando disponível). Se o GStreamer não abrir,
+    cai para o backend padrão e o leitor converte para cinza como antes. `buffer`,
+    `fps` e `resolucao` são negociados com a câmera quando o backend aceita.
+    """
+    if os.path.isdir(origem):
+        return DiretorioImagens(origem, fps_imagens, cinza)
+
+    if backend == "auto" and cinza and gstreamer_disponivel():
+        backend = "gstreamer"
+    if backend == "gstreamer":
+        cap = cv2.VideoCapture(
+            pipeline_gstreamer(origem, buffer, transporte, fps, resolucao, cinza, replay), cv2.CAP_GSTREAMER
+        )
+        if cap.isOpened():
+            return cap
+        log.warning("⚠️ GStreamer indisponível para %s; usando o backend padrão do OpenCV", origem)
+        backend = "auto"
+
+    cap = _abrir_ffmpeg(origem, transporte, aceleracao, cv2.CAP_FFMPEG if backend == "ffmpeg" else cv2.CAP_ANY)
+    if cap.isOpened():
+        if buffer:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer)
+        if resolucao:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, resolucao[0])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, resolucao[1])
+        if fps:
+            cap.set(cv2.CAP_PROP_FPS, fps)
+    return cap
+
+
+def descrever_captura(cap) -> dict:
+    """Backend e formato efetivamente negociados, para o /stream-stats"""
+    try:
+        nome = cap.getBackendName()
+    except cv2.error:
+        nome = None
+    return {
+        "backend": nome,
+        "largura": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or None,
+        "altura": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or None,
+        "fps": round(cap.get(cv2.CAP_PROP_FPS), 2) or None,
+    }
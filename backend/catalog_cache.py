@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict
+
+from repository import buscar_descricoes, catalogo_alterado_desde, catalogo_recente, versao_catalogo
+
+_AUSENTE = object()  # código consultado no banco e não cadastrado
+_NAO_CARREGADO = object()
+
+
+class CatalogCache:
+    """Cache em memória do catálogo de produtos (codigo_barras -> descricao).
+
+    Carregado no startup, atualizado por `put` quando um produto é cadastrado
+    e recarregado quando a versão do catálogo no banco muda (contagem, maior
+    id e última alteração de `produtos`, verificada no máximo a cada
+    `refresh_interval`).
+    A memória é limitada a `max_size` entradas com despejo LRU.
+    """
+
+    def __init__(self, max_size: int = 100000, refresh_interval: float = 30.0):
+        self.max_size = max_size
+        self.refresh_interval = refresh_interval
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self._versao = None
+        self._proxima_verificacao = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.despejos = 0
+        self.recargas = 0
+
+    def load(self, db):
+        """Carrega os produtos mais recentes (até `max_size`) e registra a versão"""
+        versao = versao_catalogo(db)
+        produtos = catalogo_recente(db, self.max_size)
+        with self._lock:
+            self._itens.clear()
+            for codigo, descricao in reversed(produtos):
+                self._itens[codigo] = descricao
+            self._versao = versao
+            self._proxima_verificacao = time.monotonic() + self.refresh_interval
+            self.recargas += 1
+
+    def get(self, codigo_barras: str, db):
+        """Retorna a descrição cadastrada ou None"""
+        return self.get_many([codigo_barras], db).get(codigo_barras)
+
+    def get_many(self, codigos, db) -> dict:
+        """Resolve vários códigos de uma vez; os misses viram um único SELECT ... IN"""
+        self._verificar_versao(db)
+
+        resultado = {}
+        faltando = []
+        with self._lock:
+            for codigo in codigos:
+                descricao = self._itens.get(codigo, _NAO_CARREGADO)
+                if descricao is not _NAO_CARREGADO:
+                    self._itens.move_to_end(codigo)
+                    self.hits += 1
+                    resultado[codigo] = None if descricao is _AUSENTE else descricao
+                else:
+                    self.misses += 1
+                    faltando.append(codigo)
+
+        if faltando:
+            encontrados = buscar_descricoes(db, faltando)
+            with self._lock:
+                for codigo in faltando:
+                    descricao = encontrados.get(codigo)
+                    self._inserir(codigo, _AUSENTE if descricao is None else descricao)
+                    resultado[codigo] = descricao
+
+        return resultado
+
+    def peek(self, codigo_barras: str):
+        """Descrição já em memória, sem consultar o banco (None se ausente ou desconhecida)"""
+        with self._lock:
+            descricao = self._itens.get(codigo_barras)
+        return None if descricao is _AUSENTE else descricao
+
+    def put(self, codigo_barras: str, descricao: str):
+        with self._lock:
+            self._inserir(codigo_barras, descricao)
+
+    def invalidate(self):
+        """Força a recarga na próxima consulta"""
+        with self._lock:
+            self._versao = None
+            self._proxima_verificacao = 0.0
+
+    def get_stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "itens": len(self._itens),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+                "despejos": self.despejos,
+                "recargas": self.recargas,
+            }
+
+    def _inserir(self, codigo, descricao):
+        self._itens[codigo] = descricao
+        self._itens.move_to_end(codigo)
+        while len(self._itens) > self.max_size:
+            self._itens.popitem(last=False)
+            self.despejos += 1
+
+    def _verificar_versao(self, db):
+        if time.monotonic() < self._proxima_verificacao:
+            return
+
+        versao = versao_catalogo(db)
+        if versao == self._versao:
+            self._proxima_verificacao = time.monotonic() + self.refresh_interval
+        elif self._versao is not None and self._sem_remocoes(self._versao, versao):
+            self._carregar_alterados(db, versao)
+        else:
+            self.load(db)
+
+    @staticmethod
+    def _sem_remocoes(antiga, nova):
+        """Só houve cadastros (ids crescentes) e trocas de descrição desde a última versão?"""
+        total_antigo, maior_antigo, alterado_antigo = antiga
+        total_novo, maior_novo, _ = nova
+        return (
+            maior_antigo is not None and maior_novo is not None and alterado_antigo is not None
+            and total_novo - total_antigo == maior_novo - maior_antigo >= 0
+        )
+
+    def _carregar_alterados(self, db, versao):
+        """Refresh incremental: busca só os produtos cadastrados ou alterados desde a versão anterior"""
+        alterados = catalogo_alterado_desde(db, self._versao[2])
+        with self._lock:
+            for codigo, descricao in alterados:
+                self._inserir(codigo, descricao)
+            self._versao = versao
+            self._proxima_verificacao = time.monotonic() + self.refresh_interval
+
+
+catalogo = CatalogCache()
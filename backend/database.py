@@ -1,23 +1,161 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, UniqueConstraint
+import os
+from sqlalchemy import create_engine, event, inspect, text, Column, Index, Integer, String, DateTime
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from datetime import datetime
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./leituras.db"
+SQLITE_URL_PADRAO = "sqlite:///./leituras.db"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+def _url_banco(url: str = None):
+    url = url or os.getenv("DATABASE_URL") or SQLITE_URL_PADRAO
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    return make_url(url)
+
+# Pool do Postgres: no Vercel (VERCEL=1) cada instância atende uma requisição
+# por vez e a engine é reaproveitada entre invocações quentes, então basta um
+# pool pequeno; no servidor, as rotas async, a fila de gravação e as
+# exportações usam conexões ao mesmo tempo
+POOL_PADRAO = (1, 2) if os.getenv("VERCEL") else (5, 10)
+
+def _opcoes_pool():
+    return dict(
+        pool_size=int(os.getenv("DB_POOL_SIZE", POOL_PADRAO[0])),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", POOL_PADRAO[1])),
+        pool_pre_ping=True,
+        pool_recycle=300
+    )
+
+# Perfil do SQLite local: WAL deixa leitores e o escritor trabalharem em
+# paralelo; synchronous=NORMAL só sincroniza o disco nos checkpoints
+PRAGMAS_SQLITE = (
+    "journal_mode = WAL",
+    "synchronous = NORMAL",
+    f"mmap_size = {256 * 1024 * 1024}",
+    "cache_size = -65536",  # 64 MiB
+    "busy_timeout = 5000",
+)
+LEITORES_SQLITE = int(os.getenv("SQLITE_READ_POOL", "4"))
+
+def configurar_sqlite(engine, somente_leitura: bool = False):
+    """Aplica PRAGMAS_SQLITE (e query_only, se for o caso) em cada conexão nova"""
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for pragma in PRAGMAS_SQLITE:
+            cursor.execute(f"PRAGMA {pragma}")
+        if somente_leitura:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+    return engine
+
+def criar_engine(url: str = None, conexao_unica: bool = False, somente_leitura: bool = False):
+    """Engine única do projeto: Postgres se DATABASE_URL estiver definida, senão SQLite local"""
+    url = _url_banco(url)
+    if url.get_backend_name() == "sqlite":
+        tamanho = dict(pool_size=1, max_overflow=0) if conexao_unica else dict(pool_size=LEITORES_SQLITE)
+        return configurar_sqlite(
+            create_engine(url, connect_args={"check_same_thread": False}, **tamanho), somente_leitura
+        )
+    return create_engine(url, **_opcoes_pool())
+
+def criar_engine_async(url: str = None):
+    """Mesmo banco de `criar_engine`, pelos drivers asyncio (aiosqlite / asyncpg).
+
+    No SQLite é um pool de conexões somente leitura: as rotas só consultam e
+    toda gravação passa pela conexão de escrita (`SessionEscrita`).
+    """
+    url = _url_banco(url)
+    if url.get_backend_name() == "sqlite":
+        engine = create_async_engine(
+            url.set(drivername="sqlite+aiosqlite"), poolclass=AsyncAdaptedQueuePool, pool_size=LEITORES_SQLITE
+        )
+        configurar_sqlite(engine.sync_engine, somente_leitura=True)
+        return engine
+    
+    connect_args = {}
+    if "sslmode" in url.query:
+        # asyncpg não entende sslmode da URL libpq (ex.: ?sslmode=require do Supabase)
+        connect_args["ssl"] = url.query["sslmode"]
+        url = url.difference_update_query(["sslmode"])
+    return create_async_engine(
+        url.set(drivername="postgresql+asyncpg"), connect_args=connect_args, **_opcoes_pool()
+    )
+
+engine = criar_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Escritor único: no SQLite, uma conexão dedicada usada pela fila de gravação
+# (e pelos poucos cadastros da API), sem disputar o lock com os leitores
+engine_escrita = criar_engine(conexao_unica=True) if engine.dialect.name == "sqlite" else engine
+SessionEscrita = sessionmaker(autocommit=False, autoflush=False, bind=engine_escrita)
+
+# Caminho assíncrono das rotas do FastAPI: as consultas do repositório rodam
+# via AsyncSession.run_sync, sem bloquear o event loop. Criado no primeiro uso,
+# para que os handlers serverless (só psycopg2) não precisem dos drivers async.
+_engine_async = None
+_AsyncSessionLocal = None
+
+def async_session():
+    global _engine_async, _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        _engine_async = criar_engine_async()
+        _AsyncSessionLocal = async_sessionmaker(_engine_async, autoflush=False, expire_on_commit=False)
+    return _AsyncSessionLocal()
+
+async def fechar_async():
+    """Fecha o pool assíncrono (cada conexão aiosqlite mantém uma thread própria)"""
+    global _engine_async, _AsyncSessionLocal
+    if _engine_async is not None:
+        await _engine_async.dispose()
+        _engine_async = _AsyncSessionLocal = None
+
 Base = declarative_base()
 
 class Leitura(Base):
     __tablename__ = "leituras"
     
     id = Column(Integer, primary_key=True, index=True)
-    codigo_barras = Column(String, index=True)
+    codigo_barras = Column(String, unique=True, index=True)  # um contador por código (alvo do UPSERT)
     descricao = Column(String, default="Não identificado")
     quantidade = Column(Integer, default=1)
     data_hora = Column(DateTime, default=datetime.utcnow)
+    stream_id = Column(String, index=True, nullable=True)  # câmera/linha da última leitura
+    
+    # Paginação por chave em GET /leituras
+    __table_args__ = (Index("ix_leituras_data_hora_id", "data_hora", "id"),)
+
+class LeituraEvento(Base):
+    """Log append-only: uma linha por detecção (leituras guarda os contadores)"""
+    __tablename__ = "leitura_eventos"
+    
+    id = Column(Integer, primary_key=True)
+    codigo_barras = Column(String, index=True, nullable=False)
+    descricao = Column(String, nullable=False)
+    stream_id = Column(String, nullable=True)
+    data_hora = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (Index("ix_leitura_eventos_data_hora_id", "data_hora", "id"),)
+
+class RelatorioProduto(Base):
+    """Total de leituras por descrição, mantido na mesma transação das gravações"""
+    __tablename__ = "relatorio_produtos"
+    
+    descricao = Column(String, primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+
+class LeituraRollup(Base):
+    """Itens por bucket de tempo (minuto/hora/dia), descrição e stream"""
+    __tablename__ = "leitura_rollups"
+    
+    granularidade = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    descricao = Column(String, primary_key=True)
+    stream_id = Column(String, primary_key=True, default="")  # "" quando a leitura não tem stream
+    quantidade = Column(Integer, nullable=False, default=0)
 
 class Produto(Base):
     __tablename__ = "produtos"
@@ -26,12 +164,62 @@ class Produto(Base):
     codigo_barras = Column(String, unique=True, index=True, nullable=False)
     descricao = Column(String, nullable=False)
     data_cadastro = Column(DateTime, default=datetime.utcnow)
+    # Cadastro ou última troca de descrição: entra na versão do catálogo em cache
+    atualizado_em = Column(DateTime, default=datetime.utcnow, index=True)
+
+def atualizar_schema(bind=engine):
+    """Adiciona colunas novas em bancos criados por versões anteriores"""
+    colunas = {c["name"] for c in inspect(bind).get_columns("leituras")}
+    colunas_produtos = {c["name"] for c in inspect(bind).get_columns("produtos")}
+    codigo_unico = _codigo_barras_unico(bind)
+    with bind.begin() as conn:
+        if "atualizado_em" not in colunas_produtos:
+            conn.execute(text("ALTER TABLE produtos ADD COLUMN atualizado_em TIMESTAMP"))
+            conn.execute(text("UPDATE produtos SET atualizado_em = data_cadastro"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_produtos_atualizado_em ON produtos (atualizado_em)"))
+        if "stream_id" not in colunas:
+            conn.execute(text("ALTER TABLE leituras ADD COLUMN stream_id VARCHAR"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_leituras_stream_id ON leituras (stream_id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_leituras_data_hora_id ON leituras (data_hora, id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_leitura_eventos_data_hora_id ON leitura_eventos (data_hora, id)"))
+        if not codigo_unico:
+            _unificar_leituras_duplicadas(conn)
+            conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ux_leituras_codigo_barras ON leituras (codigo_barras)"))
 
-Base.metadata.create_all(bind=engine)
+def _codigo_barras_unico(bind) -> bool:
+    insp = inspect(bind)
+    indices = insp.get_indexes("leituras") + insp.get_unique_constraints("leituras")
+    return any(
+        i["column_names"] == ["codigo_barras"] and i.get("unique", True)
+        for i in indices
+    )
+
+def _unificar_leituras_duplicadas(conn):
+    """Soma contadores duplicados do mesmo código numa única linha (a de menor id)"""
+    duplicados = conn.execute(text(
+        "SELECT codigo_barras FROM leituras GROUP BY codigo_barras HAVING COUNT(*) > 1"
+    )).scalars().all()
+    for codigo in duplicados:
+        linhas = conn.execute(
+            text("SELECT id, quantidade, data_hora FROM leituras WHERE codigo_barras = :c ORDER BY id"),
+            {"c": codigo}
+        ).all()
+        conn.execute(
+            text("UPDATE leituras SET quantidade = :q, data_hora = :d WHERE id = :id"),
+            {"q": sum(l.quantidade or 0 for l in linhas), "d": max((l.data_hora for l in linhas if l.data_hora), default=None), "id": linhas[0].id}
+        )
+        conn.execute(
+            text("DELETE FROM leituras WHERE codigo_barras = :c AND id <> :id"),
+            {"c": codigo, "id": linhas[0].id}
+        )
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with async_session() as db:
+        yield db
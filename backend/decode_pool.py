@@ -0,0 +1,276 @@
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+from pyzbar import pyzbar
+
+from logs import obter_logger
+from preprocess import reduzir
+
+log = obter_logger("decode_pool")
+
+# Tamanho inicial de cada slot (um frame 1080p em cinza); cresce com frames maiores
+SLOT_BYTES_PADRAO = 1920 * 1080
+# Segundos que o leitor espera pelo resultado de um frame antes de desistir dele;
+# um frame pendente há mais tempo que isso indica worker travado
+TIMEOUT_DECODIFICACAO = 5.0
+# Segundos que `submit` espera por um slot livre antes de decodificar no chamador
+ESPERA_SLOT = 1.0
+# Segundos entre as verificações de workers mortos
+INTERVALO_VERIFICACAO = 0.5
+
+
+def decodificar_codigos(gray, pyramid_levels: int = 0):
+    """Decodifica um frame em escala de cinza e retorna a lista de códigos.
+
+    Com `pyramid_levels`, tenta primeiro a imagem reduzida e só volta para a
+    resolução completa quando nada é encontrado.
+    """
+    if pyramid_levels > 0:
+        codigos = [barcode.data.decode('utf-8') for barcode in pyzbar.decode(reduzir(gray, pyramid_levels))]
+        if codigos:
+            return codigos
+    return [barcode.data.decode('utf-8') for barcode in pyzbar.decode(gray)]
+
+
+def _worker(tarefas, resultados, nomes_slots, slot_bytes):
+    """Processo de decodificação: lê frames da memória compartilhada"""
+    slots = [shared_memory.SharedMemory(name=nome) for nome in nomes_slots]
+    buffers = [np.ndarray((slot_bytes,), dtype=np.uint8, buffer=s.buf) for s in slots]
+    try:
+        while True:
+            tarefa = tarefas.get()
+            if tarefa is None:
+                break
+
+            tarefa_id, slot, shape, pyramid_levels = tarefa
+            gray = buffers[slot][:shape[0] * shape[1]].reshape(shape)
+            try:
+                resultados.put((tarefa_id, decodificar_codigos(gray, pyramid_levels), None))
+            except Exception as e:
+                resultados.put((tarefa_id, None, str(e)))
+            del gray
+    except KeyboardInterrupt:
+        pass
+    finally:
+        del buffers
+        for s in slots:
+            s.close()
+
+
+def _concluir(futuro: Future, codigos=None, erro: str = None):
+    if not futuro.set_running_or_notify_cancel():
+        return  # quem esperava desistiu (timeout) e cancelou o Future
+    if erro is not None:
+        futuro.set_exception(RuntimeError(erro))
+    else:
+        futuro.set_result(codigos)
+
+
+class DecodePool:
+    """Pool de processos para o pyzbar, alimentado por memória compartilhada.
+
+    Cada frame é copiado para um slot livre de `SharedMemory` e só o índice
+    do slot trafega pela fila, evitando serializar arrays numpy. Um frame
+    maior que os slots faz o pool realocá-los no tamanho dele. `submit`
+    devolve um Future; quem chama é responsável por consumir os resultados
+    na ordem dos frames.
+
+    Se um worker morre (segfault no zbar, OOM) ou trava num frame além de
+    TIMEOUT_DECODIFICACAO, os frames pendentes falham, os slots voltam para
+    a fila e os workers são recriados com filas novas: um processo morto pode
+    deixar preso o lock interno da fila de tarefas.
+    """
+
+    def __init__(self, workers: int = None, slot_bytes: int = SLOT_BYTES_PADRAO):
+        self.workers = workers or os.cpu_count() or 1
+        self.frames_inline = 0  # frames decodificados no chamador (nenhum slot livre a tempo)
+        self.reinicios = 0
+        self.realocacoes = 0
+        self._fechando = False
+
+        self._ctx = ctx = mp.get_context("spawn")
+        self._criar_slots(slot_bytes)
+
+        self._tarefas = ctx.Queue()
+        self._resultados = ctx.Queue()
+        self._pendentes = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+
+        self._processos = [self._novo_worker() for _ in range(self.workers)]
+
+        self._coletor = threading.Thread(target=self._coletar, daemon=True)
+        self._coletor.start()
+
+    def _criar_slots(self, slot_bytes: int):
+        self.slot_bytes = slot_bytes
+        n_slots = self.workers * 2
+        self._shm = [shared_memory.SharedMemory(create=True, size=slot_bytes) for _ in range(n_slots)]
+        self._buffers = [np.ndarray((slot_bytes,), dtype=np.uint8, buffer=s.buf) for s in self._shm]
+        # Fila nova a cada realocação: quem ainda espera na antiga percebe a troca
+        self._livres = queue.Queue()
+        for slot in range(n_slots):
+            self._livres.put(slot)
+
+    def _liberar_slots(self):
+        del self._buffers
+        for s in self._shm:
+            s.close()
+            s.unlink()
+
+    def _novo_worker(self):
+        nomes = [s.name for s in self._shm]
+        processo = self._ctx.Process(
+            target=_worker, args=(self._tarefas, self._resultados, nomes, self.slot_bytes), daemon=True
+        )
+        processo.start()
+        return processo
+
+    def submit(self, gray, pyramid_levels: int = 0) -> Future:
+        if gray.ndim != 2:
+            return self._inline(gray, pyramid_levels)
+        if gray.nbytes > self.slot_bytes:
+            self._realocar(gray.nbytes)
+
+        livres = self._livres
+        try:
+            slot = livres.get(timeout=ESPERA_SLOT)
+        except queue.Empty:
+            # Todos os slots presos (pool travado ou sobrecarregado): não bloqueia o leitor
+            return self._inline(gray, pyramid_levels)
+
+        futuro = Future()
+        tarefa_id = next(self._ids)
+        with self._lock:  # não pode cair na fila nem nos slots antigos durante um reinício
+            if livres is not self._livres or gray.nbytes > self.slot_bytes:
+                return self._inline(gray, pyramid_levels)  # slots realocados enquanto esperava
+            destino = self._buffers[slot][:gray.size].reshape(gray.shape)
+            np.copyto(destino, gray)
+            del destino
+            self._pendentes[tarefa_id] = (futuro, slot, time.monotonic())
+            self._tarefas.put((tarefa_id, slot, gray.shape, pyramid_levels))
+        return futuro
+
+    def _realocar(self, nbytes: int):
+        """Troca os slots por outros do tamanho do frame e recria os workers"""
+        # Deixa os frames em andamento terminarem (mudança de resolução é rara)
+        prazo = time.monotonic() + TIMEOUT_DECODIFICACAO
+        while self._pendentes and time.monotonic() < prazo:
+            time.sleep(0.01)
+        with self._lock:
+            if nbytes <= self.slot_bytes or self._fechando:
+                return
+            anterior = self.slot_bytes
+            descartados = self._parar_workers()
+            self._liberar_slots()
+            self._criar_slots(nbytes)
+            self._processos = [self._novo_worker() for _ in range(self.workers)]
+            self.realocacoes += 1
+        log.info("📐 Slots do pool de decodificação: %s -> %s bytes (%s frames descartados)",
+                 anterior, nbytes, descartados)
+
+    def _inline(self, gray, pyramid_levels):
+        futuro = Future()
+        self.frames_inline += 1
+        try:
+            futuro.set_result(decodificar_codigos(gray, pyramid_levels))
+        except Exception as e:
+            futuro.set_exception(e)
+        return futuro
+
+    def _coletar(self):
+        verificado_em = time.monotonic()
+        while True:
+            # Com resultados chegando sem parar o get nunca expira: verifica por tempo
+            if time.monotonic() - verificado_em >= INTERVALO_VERIFICACAO:
+                self._verificar_workers()
+                verificado_em = time.monotonic()
+            try:
+                mensagem = self._resultados.get(timeout=INTERVALO_VERIFICACAO)
+            except queue.Empty:
+                continue
+            if mensagem is None:
+                break
+
+            tarefa_id, codigos, erro = mensagem
+            with self._lock:
+                pendente = self._pendentes.pop(tarefa_id, None)
+                if pendente is None:
+                    continue
+                futuro, slot, _ = pendente
+                self._livres.put(slot)  # com o lock: os slots podem ter sido realocados
+            _concluir(futuro, codigos, erro)
+
+    def _verificar_workers(self):
+        """Recria o pool se algum worker morreu ou travou num frame"""
+        with self._lock:
+            if self._fechando:
+                return
+            mortos = [processo for processo in self._processos if not processo.is_alive()]
+            limite = time.monotonic() - TIMEOUT_DECODIFICACAO
+            travados = sum(1 for _, _, enviado_em in self._pendentes.values() if enviado_em < limite)
+            if not mortos and not travados:
+                return
+            descartados = self._recriar_workers()
+
+        for processo in mortos:
+            log.warning("💥 Worker de decodificação %s encerrou (código %s); pool recriado, %s frames descartados",
+                        processo.pid, processo.exitcode, descartados)
+        if travados and not mortos:
+            log.warning("⏱️ %s frames sem resposta há mais de %.0f s; pool recriado, %s frames descartados",
+                        travados, TIMEOUT_DECODIFICACAO, descartados)
+
+    def _recriar_workers(self) -> int:
+        """Troca workers e filas; os pendentes falham e devolvem o slot. Chamar com `_lock`"""
+        descartados = self._parar_workers()
+        self._processos = [self._novo_worker() for _ in range(self.workers)]
+        self.reinicios += 1
+        return descartados
+
+    def _parar_workers(self) -> int:
+        for processo in self._processos:
+            if processo.is_alive():
+                processo.terminate()
+            processo.join(timeout=2)
+            if processo.is_alive():
+                processo.kill()
+                processo.join(timeout=2)
+        # Sem close(): o coletor pode estar num get da fila antiga, que sai por timeout
+        for fila in (self._tarefas, self._resultados):
+            fila.cancel_join_thread()
+        self._tarefas = self._ctx.Queue()
+        self._resultados = self._ctx.Queue()
+
+        # Não dá para saber qual frame estava com o worker: todos os pendentes falham
+        pendentes, self._pendentes = self._pendentes, {}
+        for futuro, slot, _ in pendentes.values():
+            self._livres.put(slot)
+            _concluir(futuro, erro="worker de decodificação encerrado")
+        return len(pendentes)
+
+    def close(self):
+        with self._lock:
+            self._fechando = True
+        for _ in self._processos:
+            self._tarefas.put(None)
+        for processo in self._processos:
+            processo.join(timeout=2)
+            if processo.is_alive():
+                processo.terminate()
+
+        self._resultados.put(None)
+        self._coletor.join()
+
+        with self._lock:
+            for futuro, _, _ in self._pendentes.values():
+                futuro.cancel()
+            self._pendentes.clear()
+
+        self._liberar_slots()
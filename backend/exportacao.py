@@ -0,0 +1,110 @@
+import csv
+import io
+import json
+
+from database import SessionLocal
+from repository import colunas_de, iterar_registros
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet é opcional
+    pa = pq = None
+
+FORMATOS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def parquet_disponivel() -> bool:
+    return pa is not None
+
+
+def exportar(formato, fonte="leituras", since=None, until=None, codigo_barras=None, lote=5000,
+             session_factory=SessionLocal):
+    """Gera o arquivo em pedaços de bytes, um por lote de `lote` linhas"""
+    colunas = colunas_de(fonte)
+    db = session_factory()
+    try:
+        lotes = iterar_registros(db, fonte, since, until, codigo_barras, lote)
+        if formato == "parquet":
+            yield from _parquet(colunas, lotes)
+        elif formato == "ndjson":
+            yield from _ndjson(colunas, lotes)
+        else:
+            yield from _csv(colunas, lotes)
+    finally:
+        db.close()
+
+
+def _valor(v):
+    return v.isoformat() if hasattr(v, "isoformat") else v
+
+
+def _csv(colunas, lotes):
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    escritor.writerow(colunas)
+    for linhas in lotes:
+        escritor.writerows([_valor(v) for v in linha] for linha in linhas)
+        yield saida.getvalue().encode()
+        saida.seek(0)
+        saida.truncate()
+    if saida.tell():
+        yield saida.getvalue().encode()
+
+
+def _ndjson(colunas, lotes):
+    for linhas in lotes:
+        yield "".join(
+            json.dumps({c: _valor(v) for c, v in zip(colunas, linha)}, ensure_ascii=False) + "\n"
+            for linha in linhas
+        ).encode()
+
+
+class _Coletor:
+    """Destino do ParquetWriter que entrega os bytes a cada row group"""
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+        self.closed = False
+
+    def write(self, dados):
+        dados = bytes(dados)
+        self._partes.append(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def esvaziar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def _schema_parquet(colunas):
+    tipos = {"id": pa.int64(), "quantidade": pa.int64(), "data_hora": pa.timestamp("us")}
+    return pa.schema([(c, tipos.get(c, pa.string())) for c in colunas])
+
+
+def _parquet(colunas, lotes):
+    coletor = _Coletor()
+    schema = _schema_parquet(colunas)
+    escritor = pq.ParquetWriter(coletor, schema)
+    for linhas in lotes:
+        # um row group por lote
+        escritor.write_table(pa.Table.from_pylist([dict(zip(colunas, linha)) for linha in linhas], schema))
+        yield coletor.esvaziar()
+    escritor.close()
+    yield coletor.esvaziar()
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import deque
+
+
+class FrameBuffer:
+    """Buffer circular limitado entre a captura e a decodificação.
+
+    Mantém apenas os frames mais recentes: quando cheio, o frame mais antigo
+    é descartado (e contado) em vez de acumular atraso. Com `bloqueante`,
+    `put` espera espaço em vez de descartar (replay sem perda de frames).
+    """
+
+    def __init__(self, capacidade: int = 2, idade_maxima: float = None, bloqueante: bool = False,
+                 contador_descartes=None):
+        self.capacidade = max(1, capacidade)
+        self.idade_maxima = idade_maxima  # segundos; None = sem limite
+        self.bloqueante = bloqueante
+        self.contador_descartes = contador_descartes  # métrica com .inc(), opcional
+        self._frames = deque(maxlen=self.capacidade)
+        self._cond = threading.Condition()
+        self._fechado = False
+        self.recebidos = 0
+        self.descartados = 0
+
+    def put(self, frame_id: int, timestamp: float, frame):
+        with self._cond:
+            while self.bloqueante and len(self._frames) == self.capacidade and not self._fechado:
+                self._cond.wait()
+            if len(self._frames) == self.capacidade:
+                self._descartar()
+            self._frames.append((frame_id, timestamp, frame))
+            self.recebidos += 1
+            self._cond.notify()
+
+    def get(self, timeout: float = None):
+        """Retorna (frame_id, timestamp, frame) ou None se fechado/timeout.
+
+        Frames mais velhos que `idade_maxima` são descartados aqui, para que
+        a latência fim-a-fim fique limitada mesmo com decodificação lenta.
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                while self._frames:
+                    item = self._frames.popleft()
+                    if self.bloqueante:
+                        self._cond.notify_all()
+                    if self.idade_maxima is not None and time.monotonic() - item[1] > self.idade_maxima:
+                        self._descartar()
+                        continue
+                    return item
+
+                if self._fechado:
+                    return None
+
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return None
+                self._cond.wait(restante)
+
+    def _descartar(self):
+        self.descartados += 1
+        if self.contador_descartes is not None:
+            self.contador_descartes.inc()
+
+    def fechar(self):
+        with self._cond:
+            self._fechado = True
+            self._cond.notify_all()
+
+    @property
+    def fechado(self) -> bool:
+        return self._fechado
+
+    def __len__(self):
+        with self._cond:
+            return len(self._frames)
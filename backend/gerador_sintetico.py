@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""Gerador de vídeo sintético de esteira com códigos EAN-13, Code128 e QR.
+
+Os produtos entram pela esquerda e saem pela direita. Densidade, desfoque,
+ruído, rotação e resolução são configuráveis. Junto do vídeo (ou da pasta
+de imagens) é gravado um gabarito JSON com a entrada e a saída de cada
+produto. Use o gabarito com `benchmark_replay.py --gabarito` para medir a
+vazão e a acurácia da contagem.
+
+Requer `pip install python-barcode qrcode` (opcionais, só para este script).
+
+Uso: python gerador_sintetico.py esteira.avi [--segundos 30] [--densidade 1.5]
+     [--tipos ean13,code128,qr] [--desfoque 0] [--ruido 0] [--rotacao 0]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+try:
+    import barcode
+except ImportError:  # python-barcode é opcional
+    barcode = None
+
+try:
+    import qrcode
+except ImportError:  # qrcode é opcional
+    qrcode = None
+
+TIPOS = ("ean13", "code128", "qr")
+FUNDO = 90       # tom da esteira
+MARGEM = 12      # borda branca da etiqueta, em px
+ESPACO = 40      # distância mínima entre produtos na mesma faixa, em px
+
+
+def codigo_do_item(tipo: str, numero: int) -> str:
+    """Conteúdo gravado no símbolo (EAN-13 sem o dígito verificador)"""
+    if tipo == "ean13":
+        return f"789{numero:09d}"
+    if tipo == "code128":
+        return f"SINT{numero:06d}"
+    return f"QR-{numero:06d}"
+
+
+def renderizar_simbolo(tipo: str, conteudo: str, modulo: int = 2):
+    """Retorna (imagem em escala de cinza, código que o leitor deve ler)"""
+    if tipo == "qr":
+        if qrcode is None:
+            raise RuntimeError("Instale qrcode para gerar QR: pip install qrcode")
+        qr = qrcode.QRCode(box_size=modulo * 2, border=4)
+        qr.add_data(conteudo)
+        qr.make(fit=True)
+        imagem = qr.make_image(fill_color="black", back_color="white").convert("L")
+        return np.array(imagem, dtype=np.uint8), conteudo
+
+    if barcode is None:
+        raise RuntimeError("Instale python-barcode para gerar EAN-13/Code128: pip install python-barcode")
+    simbolo = barcode.get_barcode_class(tipo)(conteudo)
+    # Rasteriza a sequência de módulos direto, com largura exata em px
+    modulos = np.array([c == "1" for c in simbolo.build()[0]])
+    linha = np.where(np.repeat(modulos, modulo), 0, 255).astype(np.uint8)
+    linha = np.pad(linha, 10 * modulo, constant_values=255)  # zona de silêncio
+    return np.tile(linha, (40 * modulo, 1)), simbolo.get_fullcode()
+
+
+def _etiqueta(simbolo, angulo: float):
+    """Etiqueta branca com o símbolo, girada; retorna (etiqueta, máscara)"""
+    etiqueta = cv2.copyMakeBorder(simbolo, MARGEM, MARGEM, MARGEM, MARGEM, cv2.BORDER_CONSTANT, value=255)
+    mascara = np.full(etiqueta.shape, 255, dtype=np.uint8)
+    if not angulo:
+        return etiqueta, mascara
+
+    altura, largura = etiqueta.shape
+    matriz = cv2.getRotationMatrix2D((largura / 2, altura / 2), angulo, 1.0)
+    cos, sen = abs(matriz[0, 0]), abs(matriz[0, 1])
+    nova_largura = int(altura * sen + largura * cos)
+    nova_altura = int(altura * cos + largura * sen)
+    matriz[0, 2] += nova_largura / 2 - largura / 2
+    matriz[1, 2] += nova_altura / 2 - altura / 2
+    tamanho = (nova_largura, nova_altura)
+    return (
+        cv2.warpAffine(etiqueta, matriz, tamanho, flags=cv2.INTER_LINEAR, borderValue=255),
+        cv2.warpAffine(mascara, matriz, tamanho, flags=cv2.INTER_NEAREST, borderValue=0),
+    )
+
+
+def _colar(frame, etiqueta, mascara, x: int, y: int):
+    """Cola a etiqueta no frame, recortando o que estiver fora da imagem"""
+    altura, largura = etiqueta.shape
+    x0, x1 = max(0, x), min(frame.shape[1], x + largura)
+    y0, y1 = max(0, y), min(frame.shape[0], y + altura)
+    if x0 >= x1 or y0 >= y1:
+        return
+    recorte = (slice(y0, y1), slice(x0, x1))
+    origem = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+    np.copyto(frame[recorte], etiqueta[origem], where=mascara[origem] > 0)
+
+
+def _textura(largura: int, altura: int, rng):
+    """Esteira com listras leves, para o motion gate ter o que comparar"""
+    fundo = np.full((altura, largura), FUNDO, dtype=np.uint8)
+    listras = (np.arange(largura) // 24) % 2 == 0
+    fundo[:, listras] += 10
+    return cv2.add(fundo, rng.integers(0, 6, fundo.shape, dtype=np.uint8))
+
+
+class _Saida:
+    """Vídeo (.avi/.mp4) ou pasta de PNGs sem perda"""
+
+    def __init__(self, caminho: str, largura: int, altura: int, fps: float):
+        self.caminho = caminho
+        self.video = None
+        self.frames = 0
+        extensao = os.path.splitext(caminho)[1].lower()
+        if extensao in (".avi", ".mp4"):
+            codec = "MJPG" if extensao == ".avi" else "mp4v"
+            self.video = cv2.VideoWriter(caminho, cv2.VideoWriter_fourcc(*codec), fps, (largura, altura))
+            if not self.video.isOpened():
+                raise RuntimeError(f"Não foi possível criar o vídeo: {caminho}")
+        else:
+            os.makedirs(caminho, exist_ok=True)
+
+    def escrever(self, gray):
+        if self.video is not None:
+            self.video.write(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+        else:
+            cv2.imwrite(os.path.join(self.caminho, f"{self.frames:06d}.png"), gray)
+        self.frames += 1
+
+    def fechar(self):
+        if self.video is not None:
+            self.video.release()
+
+
+def entradas_esperadas(itens):
+    """Quantas entradas o leitor deve contar por código.
+
+    Produtos com o mesmo código visíveis ao mesmo tempo contam uma vez só
+    (o controle de estado só vê o código sumir quando todos saem).
+    """
+    intervalos = defaultdict(list)
+    for item in itens:
+        if item["frame_entrada"] is not None:
+            intervalos[item["codigo_barras"]].append((item["frame_entrada"], item["frame_saida"]))
+
+    esperadas = {}
+    for codigo, lista in intervalos.items():
+        lista.sort()
+        total, fim = 0, None
+        for inicio, saida in lista:
+            if fim is None or inicio > fim + 1:
+                total += 1
+                fim = saida
+            else:
+                fim = max(fim, saida)
+        esperadas[codigo] = total
+    return esperadas
+
+
+def gerar(saida: str, segundos: float = 30.0, fps: float = 30.0, largura: int = 1280, altura: int = 720,
+          densidade: float = 1.0, velocidade: float = 12.0, tipos=TIPOS, modulo: int = 2,
+          desfoque: float = 0.0, ruido: float = 0.0, rotacao: float = 0.0, codigos: int = 0,
+          seed: int = 42):
+    """Gera o vídeo e retorna o gabarito (também gravado em `<saida>.gabarito.json`).
+
+    `densidade` é a média de produtos que entram por segundo durante
+    `segundos`; depois disso a esteira roda até o último produto sair.
+    `codigos` > 0 sorteia os códigos de um conjunto desse tamanho, para
+    testar o mesmo código passando várias vezes.
+    """
+    rng = np.random.default_rng(seed)
+    aleatorio = random.Random(seed)
+    fundo = _textura(largura, altura, rng)
+    simbolos = {}
+
+    def simbolo(tipo, numero):
+        if (tipo, numero) not in simbolos:
+            simbolos[tipo, numero] = renderizar_simbolo(tipo, codigo_do_item(tipo, numero), modulo)
+        return simbolos[tipo, numero]
+
+    # Faixas horizontais da esteira, dimensionadas pela maior etiqueta possível
+    maior = max(_etiqueta(simbolo(tipo, 0)[0], rotacao)[0].shape[0] for tipo in tipos)
+    faixas = max(1, altura // (maior + ESPACO // 2))
+    altura_faixa = altura // faixas
+    ocupacao = [None] * faixas  # último item de cada faixa
+
+    itens, visiveis = [], []
+    frames_com_entrada = int(segundos * fps)
+    saida_frames = _Saida(saida, largura, altura, fps)
+    frame_id = 0
+    try:
+        while frame_id < frames_com_entrada or visiveis:
+            if frame_id < frames_com_entrada and aleatorio.random() < densidade / fps:
+                livres = [
+                    f for f in range(faixas)
+                    if ocupacao[f] is None or ocupacao[f]["x"] > ESPACO
+                ]
+                if livres:
+                    faixa = aleatorio.choice(livres)
+                    tipo = aleatorio.choice(tipos)
+                    numero = aleatorio.randrange(codigos) if codigos else len(itens)
+                    imagem, codigo = simbolo(tipo, numero)
+                    angulo = aleatorio.uniform(-rotacao, rotacao) if rotacao else 0.0
+                    etiqueta, mascara = _etiqueta(imagem, angulo)
+                    y = faixa * altura_faixa + max(0, (altura_faixa - etiqueta.shape[0]) // 2)
+                    item = {
+                        "id": len(itens), "tipo": tipo, "codigo_barras": codigo, "angulo": round(angulo, 1),
+                        "frame_entrada": None, "frame_saida": None,
+                        "x": -float(etiqueta.shape[1]), "y": min(y, altura - etiqueta.shape[0]),
+                        "_etiqueta": etiqueta, "_mascara": mascara,
+                    }
+                    itens.append(item)
+                    visiveis.append(item)
+                    ocupacao[faixa] = item
+
+            frame = fundo.copy()
+            for item in list(visiveis):
+                x = int(item["x"])
+                largura_item = item["_etiqueta"].shape[1]
+                _colar(frame, item["_etiqueta"], item["_mascara"], x, item["y"])
+                if x >= 0 and x + largura_item <= largura:
+                    # Símbolo inteiro na imagem: é aqui que o leitor pode contar
+                    if item["frame_entrada"] is None:
+                        item["frame_entrada"] = frame_id
+                    item["frame_saida"] = frame_id
+                item["x"] += velocidade
+                if item["x"] >= largura:
+                    visiveis.remove(item)
+
+            if desfoque > 0:
+                frame = cv2.GaussianBlur(frame, (0, 0), desfoque)
+            if ruido > 0:
+                frame = np.clip(frame + rng.normal(0, ruido, frame.shape), 0, 255).astype(np.uint8)
+            saida_frames.escrever(frame)
+            frame_id += 1
+    finally:
+        saida_frames.fechar()
+
+    for item in itens:
+        for chave in ("x", "y", "_etiqueta", "_mascara"):
+            del item[chave]
+        for campo in ("entrada", "saida"):
+            frame = item[f"frame_{campo}"]
+            item[f"{campo}_s"] = round(frame / fps, 3) if frame is not None else None
+
+    gabarito = {
+        "video": os.path.abspath(saida),
+        "fps": fps,
+        "frames": frame_id,
+        "largura": largura,
+        "altura": altura,
+        "parametros": {
+            "segundos": segundos, "densidade": densidade, "velocidade": velocidade, "tipos": list(tipos),
+            "modulo": modulo, "desfoque": desfoque, "ruido": ruido, "rotacao": rotacao,
+            "codigos": codigos, "seed": seed,
+        },
+        "itens": itens,
+        "entradas_esperadas": entradas_esperadas(itens),
+    }
+    with open(caminho_gabarito(saida), "w", encoding="utf-8") as arquivo:
+        json.dump(gabarito, arquivo, ensure_ascii=False, indent=2)
+    return gabarito
+
+
+def caminho_gabarito(saida: str) -> str:
+    return saida.rstrip("/\\") + ".gabarito.json"
+
+
+def avaliar(gabarito: dict, deteccoes: dict) -> dict:
+    """Compara as entradas contadas pelo leitor com as esperadas por código"""
+    esperadas = gabarito["entradas_esperadas"]
+    acertos = faltas = extras = 0
+    divergencias = []
+    for codigo in sorted(set(esperadas) | set(deteccoes)):
+        esperado, contado = esperadas.get(codigo, 0), deteccoes.get(codigo, 0)
+        acertos += min(esperado, contado)
+        faltas += max(0, esperado - contado)
+        extras += max(0, contado - esperado)
+        if esperado != contado:
+            divergencias.append({"codigo_barras": codigo, "esperado": esperado, "contado": contado})
+
+    return {
+        "esperadas": sum(esperadas.values()),
+        "contadas": sum(deteccoes.values()),
+        "acertos": acertos,
+        "faltas": faltas,    # produtos que passaram sem ser contados
+        "extras": extras,    # contagens duplicadas ou códigos inexistentes
+        "precisao": round(acertos / (acertos + extras), 4) if acertos + extras else None,
+        "recall": round(acertos / (acertos + faltas), 4) if acertos + faltas else None,
+        "divergencias": divergencias,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("saida", help="arquivo .avi/.mp4 ou pasta para PNGs")
+    parser.add_argument("--segundos", type=float, default=30, help="tempo em que entram produtos")
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--largura", type=int, default=1280)
+    parser.add_argument("--altura", type=int, default=720)
+    parser.add_argument("--densidade", type=float, default=1.0, help="produtos por segundo")
+    parser.add_argument("--velocidade", type=float, default=12, help="deslocamento da esteira em px/frame")
+    parser.add_argument("--tipos", default=",".join(TIPOS), help="lista separada por vírgulas")
+    parser.add_argument("--modulo", type=int, default=2, help="largura da barra mais fina em px")
+    parser.add_argument("--desfoque", type=float, default=0, help="sigma do desfoque gaussiano")
+    parser.add_argument("--ruido", type=float, default=0, help="desvio padrão do ruído")
+    parser.add_argument("--rotacao", type=float, default=0, help="rotação máxima em graus (±)")
+    parser.add_argument("--codigos", type=int, default=0, help="tamanho do conjunto de códigos (0 = todos únicos)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    tipos = tuple(t.strip().lower() for t in args.tipos.split(",") if t.strip())
+    invalidos = set(tipos) - set(TIPOS)
+    if not tipos or invalidos:
+        parser.error(f"tipos inválidos: {', '.join(sorted(invalidos)) or '(vazio)'}; use {', '.join(TIPOS)}")
+
+    print("=== GERADOR DE ESTEIRA SINTÉTICA ===")
+    try:
+        gabarito = gerar(
+            args.saida, args.segundos, args.fps, args.largura, args.altura, args.densidade,
+            args.velocidade, tipos, args.modulo, args.desfoque, args.ruido, args.rotacao,
+            args.codigos, args.seed,
+        )
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"🎬 {gabarito['frames']} frames ({gabarito['frames'] / args.fps:.1f} s) em {args.saida}")
+    print(f"📦 Produtos: {len(gabarito['itens'])} | Entradas esperadas: {sum(gabarito['entradas_esperadas'].values())}")
+    print(f"📝 Gabarito: {caminho_gabarito(args.saida)}")
+    print(f"💡 Avalie com: python benchmark_replay.py {args.saida} --gabarito {caminho_gabarito(args.saida)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import csv
+import io
+import itertools
+import json
+import time
+
+from database import SessionEscrita
+from catalog_cache import catalogo
+from repository import importar_produtos
+
+FORMATOS = ("csv", "jsonl")
+CONFLITOS = ("skip", "update", "fail")
+MAX_ERROS_REPORTADOS = 1000  # erros além disso só entram na contagem
+_INVALIDO = "\ufffd"  # o que errors="replace" põe no lugar de bytes que não são UTF-8
+
+
+def formato_do_arquivo(nome: str) -> str:
+    nome = (nome or "").lower()
+    return "jsonl" if nome.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def ler_produtos(arquivo, formato: str):
+    """Lê o arquivo linha a linha e gera (linha, produto, erro).
+
+    CSV precisa de cabeçalho com `codigo_barras` e `descricao` (separador
+    `,`, `;` ou tab); JSONL tem um objeto com essas chaves por linha.
+    Nada é carregado inteiro em memória. Bytes fora do UTF-8 (ex.: CSV
+    cp1252 salvo pelo Excel) viram erro da linha em que aparecem.
+    """
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        if formato == "jsonl":
+            registros = _registros_jsonl(texto)
+        else:
+            registros = _registros_csv(texto)
+
+        for linha, registro, erro in registros:
+            if erro is None:
+                codigo = str(registro.get("codigo_barras") or "").strip()
+                descricao = str(registro.get("descricao") or "").strip()
+                if not codigo or not descricao:
+                    erro = "codigo_barras e descricao são obrigatórios"
+                elif _INVALIDO in codigo or _INVALIDO in descricao:
+                    erro = "texto fora do UTF-8; salve o arquivo como UTF-8"
+                else:
+                    registro = {"codigo_barras": codigo, "descricao": descricao}
+            yield linha, (None if erro else registro), erro
+    finally:
+        texto.detach()  # o arquivo continua sendo de quem chamou
+
+
+def _registros_csv(texto):
+    cabecalho = texto.readline()
+    try:
+        delimitador = csv.Sniffer().sniff(cabecalho, delimiters=",;\t").delimiter
+    except csv.Error:
+        delimitador = ","
+    leitor = csv.DictReader(itertools.chain([cabecalho], texto), delimiter=delimitador)
+    leitor.fieldnames = [(c or "").strip().lower() for c in leitor.fieldnames or []]
+    if "codigo_barras" not in leitor.fieldnames or "descricao" not in leitor.fieldnames:
+        yield 1, None, "cabeçalho precisa de codigo_barras e descricao"
+        return
+    for registro in leitor:
+        yield leitor.line_num, registro, None
+
+
+def _registros_jsonl(texto):
+    for linha, conteudo in enumerate(texto, 1):
+        if not conteudo.strip():
+            continue
+        try:
+            registro = json.loads(conteudo)
+        except ValueError as e:
+            yield linha, None, f"JSON inválido: {e}"
+            continue
+        if not isinstance(registro, dict):
+            yield linha, None, "cada linha deve ser um objeto JSON"
+            continue
+        yield linha, registro, None
+
+
+def importar_arquivo(arquivo, formato: str = "csv", conflito: str = "skip", tamanho_lote: int = 1000,
+                     session_factory=SessionEscrita):
+    """Importa o catálogo em transações de `tamanho_lote` produtos.
+
+    Gera eventos para o cliente: um "erro" por linha rejeitada, um
+    "progresso" a cada lote gravado e um "resumo" no final. Com
+    conflito="fail", a importação para no primeiro lote com código já
+    cadastrado; os lotes anteriores continuam gravados. Uma falha de
+    leitura ou de gravação também interrompe: sai um "erro" sem linha e o
+    "resumo" conta só o que já foi gravado.
+    """
+    totais = {"linhas": 0, "inseridos": 0, "atualizados": 0, "ignorados": 0, "erros": 0, "lotes": 0}
+    inicio = time.perf_counter()
+    interrompido = False
+
+    def erro(linha, mensagem):
+        totais["erros"] += 1
+        if totais["erros"] <= MAX_ERROS_REPORTADOS:
+            return {"tipo": "erro", "linha": linha, "erro": mensagem}
+
+    lote, linhas_do_lote = [], {}
+    produtos = ler_produtos(arquivo, formato)
+    while not interrompido:
+        try:
+            registro = next(produtos, None)
+        except Exception as e:
+            interrompido = True
+            yield {"tipo": "erro", "linha": None, "erro": f"falha ao ler o arquivo: {e}"}
+            break
+        if registro is not None:
+            linha, produto, mensagem = registro
+            totais["linhas"] += 1
+            if mensagem:
+                evento = erro(linha, mensagem)
+            elif produto["codigo_barras"] in linhas_do_lote:
+                evento = erro(linha, f"código repetido no arquivo (linha {linhas_do_lote[produto['codigo_barras']]})")
+            else:
+                evento = None
+                lote.append(produto)
+                linhas_do_lote[produto["codigo_barras"]] = linha
+            if evento:
+                yield evento
+            if len(lote) < tamanho_lote:
+                continue
+
+        if lote:
+            try:
+                resultado = _gravar_lote(lote, conflito, session_factory)
+            except Exception as e:
+                interrompido = True
+                yield {"tipo": "erro", "linha": None, "erro": f"falha ao gravar o lote {totais['lotes'] + 1}: {e}"}
+                break
+            if conflito == "fail" and resultado["conflitos"]:
+                interrompido = True
+                for codigo in resultado["conflitos"]:
+                    evento = erro(linhas_do_lote[codigo], f"código já cadastrado: {codigo}")
+                    if evento:
+                        yield evento
+            else:
+                for chave in ("inseridos", "atualizados", "ignorados"):
+                    totais[chave] += resultado[chave]
+                totais["lotes"] += 1
+                yield dict(totais, tipo="progresso")
+            lote, linhas_do_lote = [], {}
+
+        if registro is None:
+            break
+
+    produtos.close()
+    yield dict(
+        totais, tipo="resumo", interrompido=interrompido,
+        duracao_s=round(time.perf_counter() - inicio, 3),
+    )
+
+
+def _gravar_lote(lote, conflito, session_factory):
+    db = session_factory()
+    try:
+        resultado = importar_produtos(db, lote, conflito)
+        if conflito == "fail" and resultado["conflitos"]:
+            db.rollback()
+            return resultado
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    for codigo, descricao in resultado["gravados"].items():
+        catalogo.put(codigo, descricao)
+    return resultado
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+from collections import OrderedDict
+
+
+class Assinatura:
+    """Fila de um cliente do feed ao vivo, com back-pressure por coalescência.
+
+    Enquanto o cliente não consome, eventos do mesmo tipo, stream e código
+    são fundidos num só (entradas somam `ocorrencias`). Passando de
+    `max_pendentes`, os mais antigos são descartados e o cliente recebe um
+    aviso de `resync` para recarregar a lista.
+    """
+
+    def __init__(self, loop, stream_id: str = None, max_pendentes: int = 256):
+        self.stream_id = stream_id
+        self.max_pendentes = max_pendentes
+        self._loop = loop
+        self._sinal = asyncio.Event()
+        self._pendentes = OrderedDict()
+        self._lock = threading.Lock()
+        self.entregues = 0
+        self.coalescidos = 0
+        self.perdidos = 0
+        self._perdidos_avisados = 0
+
+    def oferecer(self, evento: dict):
+        """Chamado de qualquer thread; nunca bloqueia quem publica"""
+        if self.stream_id is not None and evento.get("stream_id") != self.stream_id:
+            return
+
+        chave = (evento["tipo"], evento.get("stream_id"), evento["codigo_barras"])
+        with self._lock:
+            vazia = not self._pendentes
+            anterior = self._pendentes.pop(chave, None)
+            if anterior is not None:
+                evento = dict(evento, ocorrencias=anterior.get("ocorrencias", 1) + evento.get("ocorrencias", 1))
+                self.coalescidos += 1
+            elif len(self._pendentes) >= self.max_pendentes:
+                self._pendentes.popitem(last=False)
+                self.perdidos += 1
+            self._pendentes[chave] = evento
+
+        if vazia:
+            self._loop.call_soon_threadsafe(self._sinal.set)
+
+    async def proximos(self, timeout: float = None):
+        """Aguarda e retorna os eventos pendentes (lista vazia no timeout)"""
+        try:
+            await asyncio.wait_for(self._sinal.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+
+        with self._lock:
+            self._sinal.clear()
+            eventos = list(self._pendentes.values())
+            self._pendentes.clear()
+            if self.perdidos != self._perdidos_avisados:
+                self._perdidos_avisados = self.perdidos
+                eventos.insert(0, {"tipo": "resync", "perdidos": self.perdidos})
+        self.entregues += len(eventos)
+        return eventos
+
+
+class LiveFeed:
+    """Pub/sub em processo dos eventos de entrada/saída dos leitores.
+
+    `publish` é chamado pelas threads do BarcodeReader e só distribui o evento
+    para as filas dos assinantes; cada cliente SSE consome a sua no event loop.
+    """
+
+    def __init__(self, max_pendentes: int = 256):
+        self.max_pendentes = max_pendentes
+        self._assinaturas = set()
+        self._lock = threading.Lock()
+        self.publicados = 0
+
+    def subscribe(self, stream_id: str = None) -> Assinatura:
+        assinatura = Assinatura(asyncio.get_running_loop(), stream_id, self.max_pendentes)
+        with self._lock:
+            self._assinaturas.add(assinatura)
+        return assinatura
+
+    def unsubscribe(self, assinatura: Assinatura):
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    def publish(self, evento: dict):
+        with self._lock:
+            assinaturas = list(self._assinaturas)
+            self.publicados += 1
+        for assinatura in assinaturas:
+            try:
+                assinatura.oferecer(evento)
+            except RuntimeError:
+                # event loop do cliente já foi encerrado
+                self.unsubscribe(assinatura)
+
+    def get_stats(self):
+        with self._lock:
+            assinaturas = list(self._assinaturas)
+        return {
+            "clientes": len(assinaturas),
+            "publicados": self.publicados,
+            "coalescidos": sum(a.coalescidos for a in assinaturas),
+            "perdidos": sum(a.perdidos for a in assinaturas),
+        }
+
+
+live_feed = LiveFeed()
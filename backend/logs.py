@@ -0,0 +1,188 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+RAIZ = "leitor"
+_ATRIBUTOS_PADRAO = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class FormatoTexto(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        texto = super().format(record)
+        suprimidas = getattr(record, "suprimidas", 0)
+        return f"{texto} (+{suprimidas} suprimidas)" if suprimidas else texto
+
+
+class FormatoJSON(logging.Formatter):
+    """Uma linha JSON por mensagem, com os campos passados em `extra`"""
+
+    def format(self, record):
+        dados = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO and not chave.startswith("_"):
+                dados[chave] = valor
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class _Balde:
+    __slots__ = ("fichas", "atualizado", "excedentes", "suprimidas")
+
+    def __init__(self, fichas: float, agora: float):
+        self.fichas = fichas
+        self.atualizado = agora
+        self.excedentes = 0
+        self.suprimidas = 0
+
+
+class LimitadorDeLogs(logging.Filter):
+    """Limite de taxa por stream e tipo de mensagem, aplicado antes da fila.
+
+    Cada par (stream_id, texto da mensagem sem argumentos) tem um balde de
+    `rajada` fichas que recarrega `taxa` por segundo. Sem ficha, só 1 a cada
+    `amostragem` mensagens passa; as outras são contadas e a próxima que
+    passar leva o campo `suprimidas`. Também descarta o DEBUG dos streams
+    que não estão em modo debug.
+    """
+
+    def __init__(self, taxa: float, rajada: int, amostragem: int):
+        super().__init__()
+        self.taxa = taxa
+        self.rajada = rajada
+        self.amostragem = amostragem
+        self.debug_todos = False
+        self.debug_streams = set()
+        self.suprimidas = 0
+        self._baldes = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        stream_id = getattr(record, "stream_id", None)
+        if record.levelno < logging.INFO and not (self.debug_todos or stream_id in self.debug_streams):
+            return False
+        if self.taxa <= 0:
+            return True
+
+        agora = time.monotonic()
+        with self._lock:
+            chave = (stream_id, record.msg)
+            balde = self._baldes.get(chave)
+            if balde is None:
+                balde = self._baldes[chave] = _Balde(float(self.rajada), agora)
+            balde.fichas = min(self.rajada, balde.fichas + (agora - balde.atualizado) * self.taxa)
+            balde.atualizado = agora
+            if balde.fichas >= 1:
+                balde.fichas -= 1
+            else:
+                balde.excedentes += 1
+                if not self.amostragem or balde.excedentes % self.amostragem:
+                    balde.suprimidas += 1
+                    self.suprimidas += 1
+                    return False
+            if balde.suprimidas:
+                record.suprimidas, balde.suprimidas = balde.suprimidas, 0
+        return True
+
+
+class _FilaSemBloqueio(QueueHandler):
+    """Nunca bloqueia a thread de captura: com a fila cheia, a mensagem é descartada.
+
+    A thread de escrita só nasce na primeira mensagem: processos que só
+    importam o módulo (os workers `spawn` do DecodePool) não criam nenhuma.
+    """
+
+    def __init__(self, fila, saida):
+        super().__init__(fila)
+        self.descartadas = 0
+        self._saida = saida
+        self._ouvinte = None
+
+    def _iniciar(self):
+        self._ouvinte = QueueListener(self.queue, self._saida)
+        self._ouvinte.start()
+        atexit.register(self._ouvinte.stop)  # escreve o que ficou na fila
+
+    def enqueue(self, record):
+        if self._ouvinte is None:  # emit() já roda sob o lock do handler
+            self._iniciar()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartadas += 1
+
+
+def _configurar():
+    """Logger `leitor`: filtro + fila no chamador, escrita em stdout numa thread própria"""
+    nivel = os.getenv("LOG_LEVEL", "INFO").upper()
+    formato = os.getenv("LOG_FORMAT", "texto").lower()
+
+    saida = logging.StreamHandler(sys.stdout)
+    saida.setFormatter(FormatoJSON() if formato == "json" else FormatoTexto())
+    fila = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    manipulador = _FilaSemBloqueio(fila, saida)
+    limitador = LimitadorDeLogs(
+        taxa=float(os.getenv("LOG_RATE", "5")),
+        rajada=int(os.getenv("LOG_BURST", "20")),
+        amostragem=int(os.getenv("LOG_SAMPLE", "100")),
+    )
+    limitador.debug_todos = nivel == "DEBUG"
+    manipulador.addFilter(limitador)
+
+    raiz = logging.getLogger(RAIZ)
+    raiz.setLevel(nivel)
+    raiz.propagate = False
+    raiz.addHandler(manipulador)
+    return raiz, manipulador, limitador, formato
+
+
+_raiz, _manipulador, _limitador, _formato = _configurar()
+_nivel_base = _raiz.level
+
+
+def obter_logger(nome: str) -> logging.Logger:
+    return logging.getLogger(f"{RAIZ}.{nome}")
+
+
+def definir_debug(ativo: bool, stream_id: str = None):
+    """Liga/desliga o DEBUG em tempo de execução, para um stream ou para todos"""
+    if stream_id is None:
+        _limitador.debug_todos = ativo
+        if not ativo:
+            _limitador.debug_streams.clear()
+    elif ativo:
+        _limitador.debug_streams.add(stream_id)
+    else:
+        _limitador.debug_streams.discard(stream_id)
+
+    # Sem nenhum debug ligado, logger.debug() volta a sair antes de criar o registro
+    debug = _limitador.debug_todos or bool(_limitador.debug_streams)
+    _raiz.setLevel(logging.DEBUG if debug else max(logging.INFO, _nivel_base))
+
+
+def get_stats():
+    return {
+        "nivel": logging.getLevelName(_raiz.level),
+        "formato": _formato,
+        "debug_todos": _limitador.debug_todos,
+        "debug_streams": sorted(_limitador.debug_streams),
+        "taxa": _limitador.taxa,
+        "rajada": _limitador.rajada,
+        "amostragem": _limitador.amostragem,
+        "suprimidas": _limitador.suprimidas,
+        "descartadas": _manipulador.descartadas,
+        "fila": _manipulador.queue.qsize(),
+    }
@@ -1,10 +1,28 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from database import get_db, Leitura, Produto
-from barcode_reader_simple import barcode_reader
-from typing import List
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, field_validator
+from database import get_async_db, async_session, fechar_async, SessionEscrita
+from stream_manager import stream_manager
+from persistence import leitura_writer
+from catalog_cache import catalogo
+from live_feed import live_feed
+import metricas
+import logs
+from importacao import importar_arquivo, formato_do_arquivo
+from serializacao import RespostaJSON, linhas_json
+from exportacao import FORMATOS as FORMATOS_EXPORTACAO, exportar, parquet_disponivel
+from repository import (
+    listar_leituras, listar_eventos, listar_relatorio, listar_serie, cadastrar_produto, listar_produtos,
+    inicializar_banco, para_utc, LIMITE_PADRAO, LIMITE_MAXIMO
+)
+from typing import List, Literal, Optional
+from datetime import datetime, timedelta
+import json
 
 app = FastAPI(title="Barcode Reader API")
 
@@ -14,10 +32,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+class LogDebugConfig(BaseModel):
+    ativo: bool = True
+    stream_id: Optional[str] = None  # None = todos os streams
+
 class StreamConfig(BaseModel):
     url: str
+    stream_id: str = "default"   # identificador da câmera/linha
+    buffer_size: int = 2         # frames mantidos entre captura e decodificação
+    max_frame_age: Optional[float] = 0.5  # segundos; frames mais velhos são descartados
+    roi: Optional[List[int]] = None  # [x, y, largura, altura] da região da esteira
+    pyramid_levels: int = 0      # níveis de redução antes do pyzbar (retry em resolução cheia)
+    skip_identical: bool = False  # não decodificar frames iguais ao anterior
+    motion_gate: bool = False    # só decodificar quando a cena muda
+    motion_threshold: int = 8    # diferença mínima por pixel (0-255)
+    motion_min_area: float = 0.002  # fração de pixels alterados para haver movimento
+    motion_max_interval: Optional[float] = 5.0  # decodificação forçada a cada N segundos
+    capture_backend: Literal["auto", "ffmpeg", "gstreamer"] = "auto"  # auto = escolha do OpenCV
+    capture_buffer: Optional[int] = None  # frames no buffer do backend (1 = menor latência)
+    transport: Optional[Literal["tcp", "udp"]] = None  # transporte RTSP
+    target_fps: Optional[float] = None   # negociado com a câmera; o excedente é pulado com grab()
+    resolution: Optional[List[int]] = None  # [largura, altura] pedida à câmera
+    grayscale: bool = False      # decodificar direto em cinza (plano Y, GStreamer), sem cvtColor
+    hw_acceleration: bool = False  # decodificação por hardware se houver; senão, CPU
+
+    @field_validator("roi")
+    @classmethod
+    def validar_roi(cls, roi):
+        if roi is None:
+            return roi
+        if len(roi) != 4:
+            raise ValueError("roi deve ser [x, y, largura, altura]")
+        x, y, largura, altura = roi
+        if x < 0 or y < 0 or largura <= 0 or altura <= 0:
+            raise ValueError("roi precisa de x e y não negativos e largura e altura positivas")
+        return roi
 
 class LeituraResponse(BaseModel):
     id: int
@@ -25,11 +77,28 @@ class LeituraResponse(BaseModel):
     descricao: str
     quantidade: int
     data_hora: str
+    stream_id: Optional[str] = None
+
+class LeituraEventoResponse(BaseModel):
+    id: int
+    codigo_barras: str
+    descricao: str
+    stream_id: Optional[str] = None
+    data_hora: str
 
 class RelatorioResponse(BaseModel):
     descricao: str
     quantidade: int
 
+class SerieResponse(BaseModel):
+    bucket: str
+    descricao: str
+    stream_id: Optional[str] = None
+    quantidade: int
+
+# Janela padrão de /relatorio/series quando `since` não é informado
+JANELA_SERIE = {"minuto": timedelta(hours=1), "hora": timedelta(days=1), "dia": timedelta(days=30)}
+
 class ProdutoCreate(BaseModel):
     codigo_barras: str
     descricao: str
@@ -40,65 +109,259 @@ class ProdutoResponse(BaseModel):
     descricao: str
     data_cadastro: str
 
-@app.post("/start-stream")
-async def start_stream(config: StreamConfig):
+@app.exception_handler(RequestValidationError)
+async def erro_de_validacao(request: Request, exc: RequestValidationError):
+    # ROI inválida é erro de configuração do stream: 400, como as falhas ao iniciar o leitor
+    erros = [erro["msg"] for erro in exc.errors() if "roi" in erro["loc"]]
+    if erros:
+        return JSONResponse(status_code=400, content={"detail": "; ".join(erros)})
+    return await request_validation_exception_handler(request, exc)
+
+@app.on_event("startup")
+async def startup():
+    await run_in_threadpool(inicializar_banco)
+    async with async_session() as db:
+        await db.run_sync(catalogo.load)
+
+@app.on_event("shutdown")
+async def shutdown():
+    stream_manager.stop_all()
+    leitura_writer.stop()
+    await fechar_async()
+
+def _opcoes_leitura(config: StreamConfig) -> dict:
+    """Converte o StreamConfig nos parâmetros de BarcodeReader.start_reading"""
+    return dict(
+        buffer_size=config.buffer_size,
+        max_frame_age=config.max_frame_age,
+        roi=config.roi,
+        pyramid_levels=config.pyramid_levels,
+        skip_identical=config.skip_identical,
+        motion_gate=config.motion_gate,
+        motion_threshold=config.motion_threshold,
+        motion_min_area=config.motion_min_area,
+        motion_max_interval=config.motion_max_interval,
+        captura=dict(
+            backend=config.capture_backend,
+            buffer=config.capture_buffer,
+            transporte=config.transport,
+            fps=config.target_fps,
+            resolucao=config.resolution,
+            cinza=config.grayscale,
+            aceleracao=config.hw_acceleration,
+        ),
+    )
+
+@app.post("/streams")
+async def create_stream(config: StreamConfig):
     try:
-        barcode_reader.start_reading(config.url)
-        return {"message": "Stream iniciado com sucesso", "url": config.url}
+        # start/stop esperam as threads do leitor: fora do event loop
+        await run_in_threadpool(stream_manager.start, config.stream_id, config.url, **_opcoes_leitura(config))
+        return {"message": "Stream iniciado com sucesso", "stream_id": config.stream_id, "url": config.url}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.get("/streams")
+async def list_streams():
+    return stream_manager.list()
+
+@app.get("/streams/{stream_id}")
+async def get_stream(stream_id: str):
+    leitor = stream_manager.get(stream_id)
+    if leitor is None:
+        raise HTTPException(status_code=404, detail="Stream não encontrado")
+    return leitor.get_stats()
+
+@app.delete("/streams/{stream_id}")
+async def delete_stream(stream_id: str):
+    if not await run_in_threadpool(stream_manager.stop, stream_id):
+        raise HTTPException(status_code=404, detail="Stream não encontrado")
+    return {"message": "Stream parado", "stream_id": stream_id}
+
+# Endpoints de stream único, mantidos para o frontend atual
+@app.post("/start-stream")
+async def start_stream(config: StreamConfig):
+    return await create_stream(config)
+
 @app.post("/stop-stream")
-async def stop_stream():
-    barcode_reader.stop_reading()
+async def stop_stream(stream_id: str = "default"):
+    await run_in_threadpool(stream_manager.stop, stream_id)
     return {"message": "Stream parado"}
 
+@app.get("/stream-stats")
+async def stream_stats(stream_id: str = "default"):
+    leitor = stream_manager.get(stream_id)
+    return leitor.get_stats() if leitor else {"stream_id": stream_id, "ativo": False}
+
+@app.get("/catalogo-stats")
+async def catalogo_stats():
+    return catalogo.get_stats()
+
+@app.get("/live-stats")
+async def live_stats():
+    return live_feed.get_stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Métricas no formato do Prometheus (latência por etapa e por stream, descartes, retentativas)"""
+    if not metricas.disponivel():
+        raise HTTPException(status_code=503, detail="Métricas requerem: pip install prometheus-client")
+    corpo, tipo = metricas.exportar()
+    return Response(content=corpo, headers={"Content-Type": tipo})
+
+@app.get("/logs")
+async def logs_stats():
+    return logs.get_stats()
+
+@app.post("/logs/debug")
+async def logs_debug(config: LogDebugConfig):
+    """Liga/desliga o log DEBUG (estado por frame, lotes gravados) sem reiniciar"""
+    logs.definir_debug(config.ativo, config.stream_id)
+    return logs.get_stats()
+
+@app.get("/leituras/live")
+async def leituras_live(request: Request, stream_id: Optional[str] = None):
+    """Feed SSE das entradas/saídas detectadas (substitui o polling de /leituras)"""
+    async def gerar():
+        assinatura = live_feed.subscribe(stream_id)
+        try:
+            yield "retry: 2000\n\n"
+            while not await request.is_disconnected():
+                eventos = await assinatura.proximos(timeout=15)
+                if not eventos:
+                    yield ": ping\n\n"  # mantém a conexão e detecta clientes que saíram
+                    continue
+                yield "".join(
+                    f"event: {e['tipo']}\ndata: {json.dumps(e)}\n\n" for e in eventos
+                )
+        finally:
+            live_feed.unsubscribe(assinatura)
+
+    return StreamingResponse(
+        gerar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/leituras/export")
+async def exportar_leituras(
+    formato: Literal["csv", "ndjson", "parquet"] = "csv",
+    fonte: Literal["leituras", "eventos"] = "leituras",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    codigo_barras: Optional[str] = None
+):
+    """Exporta em streaming, sem carregar a tabela em memória (mesmos filtros de /leituras)"""
+    if formato == "parquet" and not parquet_disponivel():
+        raise HTTPException(status_code=400, detail="Exportação Parquet requer o pacote pyarrow")
+
+    media_type, extensao = FORMATOS_EXPORTACAO[formato]
+    nome = f"{fonte}_{datetime.utcnow():%Y%m%d_%H%M%S}.{extensao}"
+    return StreamingResponse(
+        exportar(formato, fonte, since, until, codigo_barras),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nome}"'},
+    )
+
 @app.get("/leituras", response_model=List[LeituraResponse])
-async def get_leituras(db: Session = Depends(get_db)):
-    leituras = db.query(Leitura).order_by(Leitura.data_hora.desc()).all()
-    return [
-        LeituraResponse(
-            id=l.id,
-            codigo_barras=l.codigo_barras,
-            descricao=l.descricao,
-            quantidade=l.quantidade,
-            data_hora=l.data_hora.isoformat()
+async def get_leituras(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    codigo_barras: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        leituras, proximo = await db.run_sync(
+            listar_leituras, since, until, codigo_barras, cursor, limit
         )
-        for l in leituras
-    ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # As colunas já estão na ordem de LeituraResponse: serializa as tuplas direto
+    return RespostaJSON(
+        linhas_json(leituras), headers={"X-Next-Cursor": proximo} if proximo else None
+    )
+
+@app.get("/leituras/eventos", response_model=List[LeituraEventoResponse])
+async def get_leitura_eventos(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    codigo_barras: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        eventos, proximo = await db.run_sync(
+            listar_eventos, since, until, codigo_barras, cursor, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return RespostaJSON(
+        linhas_json(eventos), headers={"X-Next-Cursor": proximo} if proximo else None
+    )
 
 @app.get("/relatorio", response_model=List[RelatorioResponse])
-async def get_relatorio(db: Session = Depends(get_db)):
-    from sqlalchemy import func
-    
-    result = db.query(
-        Leitura.descricao,
-        func.sum(Leitura.quantidade).label('total_quantidade')
-    ).group_by(Leitura.descricao).order_by(func.sum(Leitura.quantidade).desc()).all()
+async def get_relatorio(db: AsyncSession = Depends(get_async_db)):
+    result = await db.run_sync(listar_relatorio)
     
     return [
         RelatorioResponse(
             descricao=r.descricao,
-            quantidade=r.total_quantidade
+            quantidade=r.quantidade
         )
         for r in result
     ]
 
+@app.get("/relatorio/series", response_model=List[SerieResponse])
+async def get_relatorio_series(
+    granularidade: Literal["minuto", "hora", "dia"] = "hora",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    descricao: Optional[str] = None,
+    stream_id: Optional[str] = None,
+    por_stream: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    until = para_utc(until) or datetime.utcnow()
+    since = para_utc(since) or until - JANELA_SERIE[granularidade]
+    if since >= until:
+        raise HTTPException(status_code=400, detail="since deve ser anterior a until")
+
+    serie = await db.run_sync(
+        listar_serie, granularidade, since, until, descricao, stream_id, por_stream
+    )
+    return [
+        SerieResponse(
+            bucket=s.bucket.isoformat(),
+            descricao=s.descricao,
+            stream_id=(s.stream_id or None) if por_stream else None,
+            quantidade=s.quantidade
+        )
+        for s in serie
+    ]
+
+def _cadastrar_produto(codigo_barras: str, descricao: str):
+    db = SessionEscrita()
+    try:
+        # Leituras anteriores ao cadastro passam para a nova descrição
+        produto = cadastrar_produto(db, codigo_barras, descricao)
+        if produto is not None:
+            db.commit()
+        return produto
+    finally:
+        db.close()
+
 @app.post("/produtos", response_model=ProdutoResponse)
-async def create_produto(produto: ProdutoCreate, db: Session = Depends(get_db)):
-    # Verificar se já existe
-    existing = db.query(Produto).filter(Produto.codigo_barras == produto.codigo_barras).first()
-    if existing:
-        raise HTTPException(status_code=409, detail="Código de barras já cadastrado")
-    
-    # Criar novo produto
-    db_produto = Produto(
-        codigo_barras=produto.codigo_barras.strip(),
-        descricao=produto.descricao.strip()
+async def create_produto(produto: ProdutoCreate):
+    # Gravação pela conexão de escrita única, numa thread do pool
+    db_produto = await run_in_threadpool(
+        _cadastrar_produto, produto.codigo_barras.strip(), produto.descricao.strip()
     )
-    db.add(db_produto)
-    db.commit()
-    db.refresh(db_produto)
+    if db_produto is None:
+        raise HTTPException(status_code=409, detail="Código de barras já cadastrado")
+    catalogo.put(db_produto.codigo_barras, db_produto.descricao)
     
     return ProdutoResponse(
         id=db_produto.id,
@@ -107,18 +370,26 @@ async def create_produto(produto: ProdutoCreate, db: Session = Depends(get_db)):
         data_cadastro=db_produto.data_cadastro.isoformat()
     )
 
+@app.post("/produtos/bulk")
+async def importar_produtos_bulk(
+    arquivo: UploadFile = File(...),
+    formato: Optional[Literal["csv", "jsonl"]] = None,
+    conflito: Literal["skip", "update", "fail"] = "skip",
+    tamanho_lote: int = Query(1000, ge=1, le=5000)
+):
+    """Importa um catálogo CSV/JSONL; responde em NDJSON com erros por linha e progresso por lote"""
+    formato = formato or formato_do_arquivo(arquivo.filename)
+
+    def gerar():
+        for evento in importar_arquivo(arquivo.file, formato, conflito, tamanho_lote):
+            yield json.dumps(evento, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(gerar(), media_type="application/x-ndjson")
+
 @app.get("/produtos", response_model=List[ProdutoResponse])
-async def get_produtos(db: Session = Depends(get_db)):
-    produtos = db.query(Produto).order_by(Produto.data_cadastro.desc()).all()
-    return [
-        ProdutoResponse(
-            id=p.id,
-            codigo_barras=p.codigo_barras,
-            descricao=p.descricao,
-            data_cadastro=p.data_cadastro.isoformat()
-        )
-        for p in produtos
-    ]
+async def get_produtos(db: AsyncSession = Depends(get_async_db)):
+    produtos = await db.run_sync(listar_produtos)
+    return RespostaJSON(linhas_json(produtos))
 
 @app.get("/")
 async def root():
@@ -0,0 +1,75 @@
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+except ImportError:  # prometheus-client é opcional; sem ele as métricas viram no-op
+    Counter = Gauge = Histogram = None
+
+# Segundos; cobre de 0,5 ms (conversão de cor) a alguns segundos (lote travado no banco)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+ETAPAS = ("captura", "conversao", "decodificacao", "estado")
+
+
+class _Nula:
+    """Substituta das métricas quando o prometheus-client não está instalado"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, valor):
+        pass
+
+    def inc(self, valor=1):
+        pass
+
+    def set_function(self, funcao):
+        pass
+
+
+def disponivel() -> bool:
+    return Histogram is not None
+
+
+if disponivel():
+    etapa_segundos = Histogram(
+        "leitor_etapa_segundos", "Duração de cada etapa do pipeline por frame",
+        ["etapa", "stream_id"], buckets=BUCKETS,
+    )
+    deteccao_segundos = Histogram(
+        "leitor_deteccao_segundos", "Da captura do frame até a entrada gravada no banco",
+        ["stream_id"], buckets=BUCKETS,
+    )
+    lote_segundos = Histogram(
+        "persistencia_lote_segundos", "Duração da transação de cada lote gravado", buckets=BUCKETS,
+    )
+    frames_processados = Counter("leitor_frames_processados", "Frames decodificados", ["stream_id"])
+    frames_descartados = Counter(
+        "leitor_frames_descartados", "Frames descartados no buffer (cheio ou velhos demais)", ["stream_id"],
+    )
+    codigos_detectados = Counter("leitor_codigos_detectados", "Entradas de códigos registradas", ["stream_id"])
+    leituras_gravadas = Counter("persistencia_leituras_gravadas", "Leituras gravadas no banco")
+    retentativas = Counter("persistencia_retentativas", "Lotes que falharam e foram tentados de novo")
+    falhas = Counter("persistencia_falhas", "Leituras perdidas após esgotar as tentativas")
+    fila_persistencia = Gauge("persistencia_fila", "Leituras aguardando gravação")
+else:
+    etapa_segundos = deteccao_segundos = lote_segundos = _Nula()
+    frames_processados = frames_descartados = codigos_detectados = _Nula()
+    leituras_gravadas = retentativas = falhas = fila_persistencia = _Nula()
+
+
+class MetricasStream:
+    """Métricas já rotuladas de um stream, para não resolver labels a cada frame"""
+
+    def __init__(self, stream_id: str = None):
+        rotulo = stream_id or "default"
+        self.etapas = {etapa: etapa_segundos.labels(etapa, rotulo) for etapa in ETAPAS}
+        self.captura = self.etapas["captura"]
+        self.conversao = self.etapas["conversao"]
+        self.decodificacao = self.etapas["decodificacao"]
+        self.estado = self.etapas["estado"]
+        self.frames_processados = frames_processados.labels(rotulo)
+        self.frames_descartados = frames_descartados.labels(rotulo)
+        self.codigos_detectados = codigos_detectados.labels(rotulo)
+
+
+def exportar():
+    """Retorna (corpo, content-type) no formato texto do Prometheus"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,211 @@
+import queue
+import threading
+import time
+from datetime import datetime
+
+from database import SessionEscrita
+from catalog_cache import catalogo
+import metricas
+from logs import obter_logger
+from repository import compactar_rollups, registrar_leituras
+
+log = obter_logger("persistencia")
+
+
+class WriteBehindQueue:
+    """Fila write-behind para as leituras detectadas pela câmera.
+
+    As detecções são enfileiradas sem tocar no banco; uma thread dedicada
+    agrupa os itens e grava cada lote numa única transação, limitada por
+    tamanho (`batch_size`) ou tempo (`max_delay`).
+    """
+
+    def __init__(self, batch_size: int = 100, max_delay: float = 0.2, max_queue: int = 10000,
+                 max_retries: int = 3, compact_interval: float = 600.0, session_factory=SessionEscrita):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.compact_interval = compact_interval
+        self.session_factory = session_factory
+        self._fila = queue.Queue(maxsize=max_queue)
+        self._parar = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # Métricas de back-pressure
+        self.enfileirados = 0
+        self.gravados = 0
+        self.lotes = 0
+        self.bloqueios = 0    # submits que encontraram a fila cheia
+        self.descartados = 0  # submits que desistiram após o timeout
+        self.falhas = 0       # itens perdidos após esgotar as tentativas
+        self.retentativas = 0
+        self.maior_fila = 0
+        self.ultimo_lote_ms = None
+        self._ultima_compactacao = time.monotonic()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def submit(self, codigo_barras: str, data_hora: datetime = None, stream_id: str = None,
+               timeout: float = 1.0, capturado_em: float = None) -> bool:
+        """Enfileira uma detecção; bloqueia no máximo `timeout` se a fila estiver cheia.
+
+        `capturado_em` (time.monotonic do frame) mede a latência até o commit.
+        """
+        self.start()
+        item = (codigo_barras, data_hora or datetime.utcnow(), stream_id, capturado_em)
+        try:
+            self._fila.put_nowait(item)
+        except queue.Full:
+            self.bloqueios += 1
+            try:
+                self._fila.put(item, timeout=timeout)
+            except queue.Full:
+                self.descartados += 1
+                log.warning("⚠️ Fila de gravação cheia, leitura descartada: %s", codigo_barras,
+                            extra={"stream_id": stream_id, "codigo_barras": codigo_barras})
+                return False
+
+        self.enfileirados += 1
+        self.maior_fila = max(self.maior_fila, self._fila.qsize())
+        return True
+
+    def tamanho_fila(self) -> int:
+        """Itens enfileirados e ainda não retirados pela thread de gravação"""
+        return self._fila.qsize()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Aguarda até que tudo o que já foi enfileirado esteja gravado"""
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._fila.all_tasks_done:
+            while self._fila.unfinished_tasks:
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return False
+                self._fila.all_tasks_done.wait(restante)
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        self.flush(timeout)
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def get_stats(self):
+        return {
+            "fila": self.tamanho_fila(),
+            "maior_fila": self.maior_fila,
+            "enfileirados": self.enfileirados,
+            "gravados": self.gravados,
+            "lotes": self.lotes,
+            "bloqueios": self.bloqueios,
+            "descartados": self.descartados,
+            "falhas": self.falhas,
+            "retentativas": self.retentativas,
+            "ultimo_lote_ms": self.ultimo_lote_ms,
+        }
+
+    def _run(self):
+        while not self._parar.is_set():
+            if time.monotonic() - self._ultima_compactacao >= self.compact_interval:
+                self._compactar()
+
+            try:
+                primeiro = self._fila.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            lote = [primeiro]
+            limite = time.monotonic() + self.max_delay
+            while len(lote) < self.batch_size:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._fila.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            try:
+                self._gravar_com_retentativa(lote)
+            finally:
+                for _ in lote:
+                    self._fila.task_done()
+
+    def _gravar_com_retentativa(self, lote):
+        for tentativa in range(1, self.max_retries + 1):
+            inicio = time.perf_counter()
+            try:
+                self._gravar(lote)
+            except Exception as e:
+                if tentativa == self.max_retries:
+                    self.falhas += len(lote)
+                    metricas.falhas.inc(len(lote))
+                    log.error("❌ Erro ao gravar lote de %s leituras: %s", len(lote), e)
+                    return
+                self.retentativas += 1
+                metricas.retentativas.inc()
+                time.sleep(0.05 * tentativa)
+                continue
+
+            self.lotes += 1
+            self.gravados += len(lote)
+            duracao = time.perf_counter() - inicio
+            self.ultimo_lote_ms = round(duracao * 1000, 2)
+            self._observar(lote, duracao)
+            log.debug("💾 Lote gravado: %s leituras em %s ms", len(lote), self.ultimo_lote_ms,
+                      extra={"leituras": len(lote), "duracao_ms": self.ultimo_lote_ms})
+            return
+
+    def _observar(self, lote, duracao: float):
+        metricas.lote_segundos.observe(duracao)
+        metricas.leituras_gravadas.inc(len(lote))
+        agora = time.monotonic()
+        for _, _, stream_id, capturado_em in lote:
+            if capturado_em is not None:
+                metricas.deteccao_segundos.labels(stream_id or "default").observe(agora - capturado_em)
+
+    def _compactar(self):
+        """Remove buckets de rollup que já passaram da retenção"""
+        self._ultima_compactacao = time.monotonic()
+        db = self.session_factory()
+        try:
+            removidas = compactar_rollups(db)
+            db.commit()
+            if removidas:
+                log.info("🧹 Rollups compactados: %s buckets removidos", removidas)
+        except Exception as e:
+            db.rollback()
+            log.warning("⚠️ Erro ao compactar rollups: %s", e)
+        finally:
+            db.close()
+
+    def _gravar(self, lote):
+        """Grava um lote inteiro numa única transação"""
+        db = self.session_factory()
+        try:
+            descricoes = catalogo.get_many({codigo for codigo, *_ in lote}, db)
+            registrar_leituras(db, [
+                {
+                    "codigo_barras": codigo,
+                    "descricao": descricoes.get(codigo) or "Não identificado",
+                    "stream_id": stream_id,
+                    "data_hora": data_hora,
+                }
+                for codigo, data_hora, stream_id, _ in lote
+            ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+leitura_writer = WriteBehindQueue()
+metricas.fila_persistencia.set_function(leitura_writer.tamanho_fila)
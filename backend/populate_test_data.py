@@ -4,15 +4,18 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from database import SessionLocal, Leitura
-from datetime import datetime
+from database import SessionLocal, Leitura, LeituraEvento
+from repository import inicializar_banco, reconstruir_relatorio, reconstruir_rollups, registrar_leituras
+from datetime import datetime, timedelta
 
 def populate_test_data():
     print("=== POPULANDO DADOS DE TESTE ===")
     
+    inicializar_banco()
     db = SessionLocal()
     try:
         # Limpar dados existentes
+        db.query(LeituraEvento).delete()
         db.query(Leitura).delete()
         
         # Dados de teste
@@ -24,14 +27,23 @@ def populate_test_data():
             {"codigo_barras": "7891000100141", "descricao": "Pão de Açúcar", "quantidade": 20},
         ]
         
-        for item in test_data:
-            leitura = Leitura(
-                codigo_barras=item["codigo_barras"],
-                descricao=item["descricao"],
-                quantidade=item["quantidade"],
-                data_hora=datetime.utcnow()
-            )
-            db.add(leitura)
+        # Uma detecção por unidade, espalhadas na última hora, pelo mesmo caminho
+        # da câmera: eventos, contadores, relatório e rollups ficam consistentes
+        agora = datetime.utcnow()
+        eventos = [
+            {
+                "codigo_barras": item["codigo_barras"],
+                "descricao": item["descricao"],
+                "stream_id": None,
+                "data_hora": agora - timedelta(minutes=3 * i),
+            }
+            for item in test_data
+            for i in range(item["quantidade"])
+        ]
+        registrar_leituras(db, eventos)
+        # Descarta os totais das leituras apagadas acima
+        reconstruir_relatorio(db)
+        reconstruir_rollups(db)
         
         db.commit()
         print(f"✅ {len(test_data)} registros inseridos com sucesso!")
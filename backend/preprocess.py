@@ -0,0 +1,79 @@
+import time
+
+import cv2
+import numpy as np
+
+# Resolução da miniatura usada para comparar frames
+TAMANHO_MINIATURA = (160, 90)
+
+
+def recortar_roi(gray, roi):
+    """Recorta a região de interesse (x, y, largura, altura), limitada ao frame.
+
+    Uma ROI que não cruza o frame (ex.: pensada para uma resolução maior que
+    a negociada com a câmera) é limitada à borda: sobra a faixa de 1 pixel
+    mais próxima, sem levantar erro a cada frame.
+    """
+    if not roi:
+        return gray
+
+    x, y, largura, altura = roi
+    altura_frame, largura_frame = gray.shape[:2]
+    x0 = min(max(0, x), largura_frame - 1)
+    y0 = min(max(0, y), altura_frame - 1)
+    x1 = max(x0 + 1, min(largura_frame, x + largura))
+    y1 = max(y0 + 1, min(altura_frame, y + altura))
+    return gray[y0:y1, x0:x1]
+
+
+def reduzir(gray, niveis: int):
+    """Reduz o frame pela pirâmide gaussiana (metade da resolução por nível)"""
+    for _ in range(niveis):
+        if min(gray.shape[:2]) < 64:
+            break
+        gray = cv2.pyrDown(gray)
+    return gray
+
+
+def miniatura(gray):
+    return cv2.resize(gray, TAMANHO_MINIATURA, interpolation=cv2.INTER_AREA)
+
+
+class MotionGate:
+    """Portão de movimento: só libera a decodificação quando a cena muda.
+
+    Compara uma miniatura suavizada do frame com a do último frame liberado.
+    A cena é considerada alterada quando mais de `fracao_minima` dos pixels
+    diferem mais de `limiar` níveis de cinza. `intervalo_maximo` força uma
+    decodificação periódica mesmo sem movimento (None desativa).
+    """
+
+    def __init__(self, limiar: int = 8, fracao_minima: float = 0.002, intervalo_maximo: float = 5.0):
+        self.limiar = limiar
+        self.fracao_minima = fracao_minima
+        self.intervalo_maximo = intervalo_maximo
+        self._referencia = None
+        self._ultima_liberacao = 0.0
+        self.liberados = 0
+        self.ignorados = 0
+
+    def deve_decodificar(self, gray) -> bool:
+        atual = cv2.GaussianBlur(miniatura(gray), (5, 5), 0)
+        agora = time.monotonic()
+
+        if self._referencia is None or self._referencia.shape != atual.shape:
+            mudou = True
+        elif self.intervalo_maximo is not None and agora - self._ultima_liberacao >= self.intervalo_maximo:
+            mudou = True
+        else:
+            alterados = np.count_nonzero(cv2.absdiff(atual, self._referencia) > self.limiar)
+            mudou = alterados > self.fracao_minima * atual.size
+
+        if not mudou:
+            self.ignorados += 1
+            return False
+
+        self._referencia = atual
+        self._ultima_liberacao = agora
+        self.liberados += 1
+        return True
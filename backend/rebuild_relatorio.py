@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import SessionLocal
+from repository import (
+    compactar_rollups, inicializar_banco, listar_relatorio, reconstruir_relatorio, reconstruir_rollups
+)
+
+def rebuild_relatorio():
+    print("=== RECONSTRUINDO RELATÓRIO AGREGADO ===")
+    
+    inicializar_banco()
+    db = SessionLocal()
+    try:
+        reconstruir_relatorio(db)
+        reconstruir_rollups(db)
+        compactar_rollups(db)
+        db.commit()
+        
+        totais = listar_relatorio(db)
+        print(f"✅ relatorio_produtos recalculado: {len(totais)} produtos")
+        for total in totais[:10]:
+            print(f"   {total.descricao}: {total.quantidade}")
+        print("✅ leitura_rollups recalculado a partir de leitura_eventos")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro ao reconstruir relatório: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_relatorio()
@@ -0,0 +1,486 @@
+import base64
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, bindparam, delete, func, or_, select, tuple_, update
+
+from database import (
+    Base, Leitura, LeituraEvento, LeituraRollup, Produto, RelatorioProduto, atualizar_schema, engine
+)
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+# Rollups de vazão: todos os níveis são preenchidos juntos; os mais finos
+# são apagados ao envelhecer (o nível seguinte continua cobrindo o período)
+GRANULARIDADES = ("minuto", "hora", "dia")
+_CHAVES_ROLLUP = ("granularidade", "bucket", "descricao", "stream_id")
+RETENCAO = {"minuto": timedelta(days=2), "hora": timedelta(days=90), "dia": None}
+LIMITE_SERIE = 10000
+
+# Tabelas dos modelos ORM: as consultas são Core, então servem tanto o
+# FastAPI quanto os handlers do Vercel
+_leituras = Leitura.__table__
+_eventos = LeituraEvento.__table__
+_relatorio = RelatorioProduto.__table__
+_FONTES = {"leituras": _leituras, "eventos": _eventos}  # exportáveis
+_produtos = Produto.__table__
+_rollups = LeituraRollup.__table__
+
+_schema_pronto = False
+
+
+def inicializar_banco():
+    """Cria as tabelas, aplica as migrações e faz a primeira carga dos agregados.
+
+    Uma vez por processo, no startup da API e no início dos scripts.
+    """
+    global _schema_pronto
+    if _schema_pronto:
+        return
+    Base.metadata.create_all(bind=engine)
+    atualizar_schema(engine)
+    with engine.begin() as conn:
+        # Bancos que já tinham leituras antes das tabelas agregadas
+        if conn.execute(select(func.count()).select_from(_relatorio)).scalar() == 0:
+            reconstruir_relatorio(conn)
+        if conn.execute(select(func.count()).select_from(_rollups)).scalar() == 0:
+            reconstruir_rollups(conn)
+    _schema_pronto = True
+
+
+def _insert_upsert(db):
+    """`insert` com ON CONFLICT do dialeto em uso (None se não suportado)"""
+    dialeto = db.get_bind().dialect.name
+    if dialeto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialeto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+def registrar_leituras(db, eventos):
+    """Grava um lote de detecções: append no log e incremento dos contadores.
+
+    `eventos` é uma lista de dicts com codigo_barras, descricao, stream_id e
+    data_hora. Os eventos entram num INSERT em lote; cada contador de
+    `leituras` e cada total de `relatorio_produtos` recebe um único
+    `INSERT ... ON CONFLICT DO UPDATE SET quantidade = quantidade + n`,
+    atômico mesmo com vários streams ou instâncias gravando o mesmo código.
+    Não faz commit: tudo entra na transação de quem chama.
+    """
+    if not eventos:
+        return
+
+    db.execute(_eventos.insert(), eventos)
+
+    contagens = Counter(e["codigo_barras"] for e in eventos)
+    ultimo = {}  # evento mais recente de cada código
+    for evento in eventos:
+        atual = ultimo.get(evento["codigo_barras"])
+        if atual is None or evento["data_hora"] >= atual["data_hora"]:
+            ultimo[evento["codigo_barras"]] = evento
+
+    _incrementar(db, _leituras, ("codigo_barras",), [
+        {
+            "codigo_barras": codigo,
+            "descricao": ultimo[codigo]["descricao"],
+            "quantidade": quantidade,
+            "data_hora": ultimo[codigo]["data_hora"],
+            "stream_id": ultimo[codigo]["stream_id"],
+        }
+        for codigo, quantidade in contagens.items()
+    ], substituir=("descricao", "data_hora", "stream_id"))
+
+    totais = Counter()
+    for evento in eventos:
+        totais[evento["descricao"]] += 1
+    _incrementar(db, _relatorio, ("descricao",), [
+        {"descricao": descricao, "quantidade": quantidade}
+        for descricao, quantidade in totais.items()
+    ])
+
+    _incrementar(db, _rollups, _CHAVES_ROLLUP, _contar_buckets(
+        (e["data_hora"], e["descricao"], e["stream_id"]) for e in eventos
+    ))
+
+
+def _contar_buckets(eventos):
+    """Linhas de rollup para (data_hora, descricao, stream_id), em todas as granularidades"""
+    contagens = Counter()
+    for data_hora, descricao, stream_id in eventos:
+        for granularidade in GRANULARIDADES:
+            contagens[(granularidade, truncar(data_hora, granularidade), descricao, stream_id or "")] += 1
+    return [
+        {"granularidade": g, "bucket": b, "descricao": d, "stream_id": s, "quantidade": n}
+        for (g, b, d, s), n in contagens.items()
+    ]
+
+
+def _incrementar(db, tabela, chaves, linhas, substituir=()):
+    """Soma `quantidade` das linhas na tabela pelas colunas `chaves`, criando as que faltam"""
+    if not linhas:
+        return
+
+    insert = _insert_upsert(db)
+    if insert is None:
+        _incrementar_sem_upsert(db, tabela, chaves, linhas, substituir)
+        return
+
+    stmt = insert(tabela)
+    valores = {"quantidade": tabela.c.quantidade + stmt.excluded.quantidade}
+    for coluna in substituir:
+        valores[coluna] = stmt.excluded[coluna]
+    db.execute(
+        stmt.on_conflict_do_update(index_elements=[tabela.c[c] for c in chaves], set_=valores),
+        linhas,
+    )
+
+
+def _incrementar_sem_upsert(db, tabela, chaves, linhas, substituir):
+    """Caminho genérico para bancos sem ON CONFLICT: UPDATE em lote e INSERT dos novos"""
+    colunas_chave = tuple_(*[tabela.c[c] for c in chaves])
+    existentes = set(db.execute(
+        select(*[tabela.c[c] for c in chaves])
+        .where(colunas_chave.in_([tuple(l[c] for c in chaves) for l in linhas]))
+    ).tuples())
+
+    def chave(linha):
+        return tuple(linha[c] for c in chaves)
+
+    incrementos = [
+        {f"b_{coluna}": valor for coluna, valor in l.items()}
+        for l in linhas if chave(l) in existentes
+    ]
+    if incrementos:
+        valores = {"quantidade": tabela.c.quantidade + bindparam("b_quantidade")}
+        for coluna in substituir:
+            valores[coluna] = bindparam(f"b_{coluna}")
+        db.execute(
+            update(tabela)
+            .where(and_(*[tabela.c[c] == bindparam(f"b_{c}") for c in chaves]))
+            .values(**valores),
+            incrementos,
+        )
+
+    novos = [l for l in linhas if chave(l) not in existentes]
+    if novos:
+        db.execute(tabela.insert(), novos)
+
+
+def reatribuir_produto(db, codigo_barras: str, descricao: str):
+    """Move o contador de um código para a descrição recém-cadastrada.
+
+    Leituras feitas antes do cadastro ficaram como "Não identificado"; aqui o
+    total migra de grupo no relatório e os eventos do código migram de grupo
+    em leitura_rollups, na mesma transação. Não faz commit.
+    """
+    anterior = db.execute(
+        select(_leituras.c.descricao, _leituras.c.quantidade)
+        .where(_leituras.c.codigo_barras == codigo_barras)
+    ).first()
+    if anterior is None or anterior.descricao == descricao:
+        return
+
+    db.execute(
+        update(_leituras).where(_leituras.c.codigo_barras == codigo_barras).values(descricao=descricao)
+    )
+    db.execute(
+        update(_relatorio)
+        .where(_relatorio.c.descricao == anterior.descricao)
+        .values(quantidade=_relatorio.c.quantidade - anterior.quantidade)
+    )
+    _incrementar(db, _relatorio, ("descricao",), [{"descricao": descricao, "quantidade": anterior.quantidade}])
+
+    eventos_do_codigo = and_(_eventos.c.codigo_barras == codigo_barras, _eventos.c.descricao == anterior.descricao)
+    buckets = _contar_buckets(db.execute(
+        select(_eventos.c.data_hora, _eventos.c.descricao, _eventos.c.stream_id).where(eventos_do_codigo)
+    ))
+    if buckets:
+        _incrementar(db, _rollups, _CHAVES_ROLLUP, [dict(l, quantidade=-l["quantidade"]) for l in buckets])
+        # Buckets já compactados voltam negativos: somem junto com os zerados
+        db.execute(delete(_rollups).where(_rollups.c.descricao == anterior.descricao, _rollups.c.quantidade <= 0))
+        _incrementar(db, _rollups, _CHAVES_ROLLUP, [dict(l, descricao=descricao) for l in buckets])
+    # O log acompanha, para que reconstruir_rollups chegue ao mesmo resultado
+    db.execute(update(_eventos).where(eventos_do_codigo).values(descricao=descricao))
+
+
+def listar_relatorio(db):
+    """Totais por descrição, lidos da tabela agregada (O(produtos distintos))"""
+    return db.execute(
+        select(_relatorio.c.descricao, _relatorio.c.quantidade)
+        .where(_relatorio.c.quantidade > 0)
+        .order_by(_relatorio.c.quantidade.desc())
+    ).all()
+
+
+def reconstruir_relatorio(db):
+    """Recalcula relatorio_produtos a partir de leituras, corrigindo qualquer desvio"""
+    db.execute(delete(_relatorio))
+    db.execute(_relatorio.insert().from_select(
+        ["descricao", "quantidade"],
+        select(_leituras.c.descricao, func.sum(_leituras.c.quantidade))
+        .where(_leituras.c.descricao.is_not(None))
+        .group_by(_leituras.c.descricao),
+    ))
+
+
+def reconstruir_rollups(db):
+    """Recalcula leitura_rollups a partir do log de eventos (todas as granularidades)"""
+    db.execute(delete(_rollups))
+    linhas = _contar_buckets(db.execute(
+        select(_eventos.c.data_hora, _eventos.c.descricao, _eventos.c.stream_id)
+    ))
+    if linhas:
+        db.execute(_rollups.insert(), linhas)
+
+
+def listar_produtos(db):
+    """Produtos cadastrados, mais recentes primeiro"""
+    return db.execute(select(_produtos).order_by(_produtos.c.data_cadastro.desc())).all()
+
+
+def cadastrar_produto(db, codigo_barras: str, descricao: str):
+    """Cadastra o produto e reatribui as leituras anteriores a ele.
+
+    Retorna a linha criada, ou None se o código já estiver cadastrado.
+    Não faz commit.
+    """
+    existente = db.execute(
+        select(_produtos.c.id).where(_produtos.c.codigo_barras == codigo_barras)
+    ).first()
+    if existente is not None:
+        return None
+
+    agora = datetime.utcnow()
+    produto = db.execute(
+        _produtos.insert()
+        .values(codigo_barras=codigo_barras, descricao=descricao, data_cadastro=agora, atualizado_em=agora)
+        .returning(*_produtos.c)
+    ).one()
+    reatribuir_produto(db, codigo_barras, descricao)
+    return produto
+
+
+def importar_produtos(db, produtos, conflito: str = "skip"):
+    """Grava um lote de produtos (dicts com codigo_barras e descricao) de uma vez.
+
+    Códigos já cadastrados seguem `conflito`: "skip" mantém o cadastro atual,
+    "update" troca a descrição e "fail" não grava nada do lote. Um SELECT
+    resolve os conflitos do lote inteiro, seguido de um INSERT e um UPDATE
+    em lote. Não faz commit.
+    """
+    codigos = [p["codigo_barras"] for p in produtos]
+    existentes = dict(db.execute(
+        select(_produtos.c.codigo_barras, _produtos.c.descricao).where(_produtos.c.codigo_barras.in_(codigos))
+    ).all())
+    conflitos = [c for c in codigos if c in existentes]
+    resultado = {"inseridos": 0, "atualizados": 0, "ignorados": 0, "conflitos": conflitos, "gravados": {}}
+    if conflito == "fail" and conflitos:
+        return resultado
+
+    agora = datetime.utcnow()
+    novos = [p for p in produtos if p["codigo_barras"] not in existentes]
+    if novos:
+        db.execute(_produtos.insert(), [
+            {"codigo_barras": p["codigo_barras"], "descricao": p["descricao"],
+             "data_cadastro": agora, "atualizado_em": agora}
+            for p in novos
+        ])
+
+    alterados = []
+    if conflito == "update":
+        alterados = [p for p in produtos if existentes.get(p["codigo_barras"], p["descricao"]) != p["descricao"]]
+        if alterados:
+            db.execute(
+                update(_produtos)
+                .where(_produtos.c.codigo_barras == bindparam("b_codigo_barras"))
+                .values(descricao=bindparam("b_descricao"), atualizado_em=agora),
+                [{"b_codigo_barras": p["codigo_barras"], "b_descricao": p["descricao"]} for p in alterados],
+            )
+
+    # Leituras feitas antes do cadastro (ou da troca) passam para a descrição nova
+    gravados = {p["codigo_barras"]: p["descricao"] for p in novos + alterados}
+    if gravados:
+        lidos = db.execute(
+            select(_leituras.c.codigo_barras).where(_leituras.c.codigo_barras.in_(list(gravados)))
+        ).scalars().all()
+        for codigo in lidos:
+            reatribuir_produto(db, codigo, gravados[codigo])
+
+    resultado.update(
+        inseridos=len(novos), atualizados=len(alterados),
+        ignorados=len(conflitos) - len(alterados), gravados=gravados,
+    )
+    return resultado
+
+
+def versao_catalogo(db):
+    """(quantidade, maior id, última alteração) de produtos: muda a cada
+    cadastro, remoção ou troca de descrição"""
+    return tuple(db.execute(select(
+        func.count(_produtos.c.id), func.max(_produtos.c.id), func.max(_produtos.c.atualizado_em)
+    )).one())
+
+
+def catalogo_recente(db, limite: int):
+    """Os `limite` produtos mais recentes como (codigo_barras, descricao)"""
+    return db.execute(
+        select(_produtos.c.codigo_barras, _produtos.c.descricao)
+        .order_by(_produtos.c.id.desc())
+        .limit(limite)
+    ).all()
+
+
+def catalogo_alterado_desde(db, atualizado_em: datetime):
+    """Produtos cadastrados ou alterados a partir de `atualizado_em`, em ordem de alteração"""
+    return db.execute(
+        select(_produtos.c.codigo_barras, _produtos.c.descricao)
+        .where(_produtos.c.atualizado_em >= atualizado_em)
+        .order_by(_produtos.c.atualizado_em, _produtos.c.id)
+    ).all()
+
+
+def buscar_descricoes(db, codigos) -> dict:
+    """codigo_barras -> descricao dos códigos cadastrados, num único SELECT ... IN"""
+    return dict(db.execute(
+        select(_produtos.c.codigo_barras, _produtos.c.descricao)
+        .where(_produtos.c.codigo_barras.in_(list(codigos)))
+    ).all())
+
+
+def truncar(data_hora: datetime, granularidade: str) -> datetime:
+    """Início do bucket de `data_hora` na granularidade pedida"""
+    if granularidade == "minuto":
+        return data_hora.replace(second=0, microsecond=0)
+    if granularidade == "hora":
+        return data_hora.replace(minute=0, second=0, microsecond=0)
+    if granularidade == "dia":
+        return data_hora.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Granularidade inválida: {granularidade}")
+
+
+def listar_serie(db, granularidade, since, until, descricao=None, stream_id=None, por_stream=True):
+    """Itens por bucket (e por linha, se `por_stream`) no intervalo [since, until)"""
+    colunas = [_rollups.c.bucket, _rollups.c.descricao]
+    if por_stream:
+        colunas.append(_rollups.c.stream_id)
+    stmt = (
+        select(*colunas, func.sum(_rollups.c.quantidade).label("quantidade"))
+        .where(
+            _rollups.c.granularidade == granularidade,
+            _rollups.c.bucket >= truncar(since, granularidade),
+            _rollups.c.bucket < until,
+        )
+        .group_by(*colunas)
+        .order_by(_rollups.c.bucket, _rollups.c.descricao)
+        .limit(LIMITE_SERIE)
+    )
+    if descricao is not None:
+        stmt = stmt.where(_rollups.c.descricao == descricao)
+    if stream_id is not None:
+        stmt = stmt.where(_rollups.c.stream_id == stream_id)
+    return db.execute(stmt).all()
+
+
+def compactar_rollups(db, agora: datetime = None):
+    """Apaga os buckets finos mais velhos que a retenção; retorna as linhas removidas"""
+    agora = agora or datetime.utcnow()
+    removidas = 0
+    for granularidade, retencao in RETENCAO.items():
+        if retencao is None:
+            continue
+        resultado = db.execute(
+            delete(_rollups).where(
+                _rollups.c.granularidade == granularidade,
+                _rollups.c.bucket < agora - retencao,
+            )
+        )
+        removidas += resultado.rowcount or 0
+    return removidas
+
+
+def codificar_cursor(data_hora: datetime, id: int) -> str:
+    """Cursor opaco da paginação por chave (data_hora, id)"""
+    return base64.urlsafe_b64encode(f"{data_hora.isoformat()}|{id}".encode()).decode()
+
+
+def decodificar_cursor(cursor: str):
+    """Inverso de `codificar_cursor`; levanta ValueError se o cursor for inválido"""
+    try:
+        data_hora, id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(data_hora), int(id)
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+
+def para_utc(data_hora):
+    """O banco guarda UTC sem fuso: `...Z` ou `...-03:00` viram UTC ingênuo"""
+    if data_hora is None or data_hora.tzinfo is None:
+        return data_hora
+    return data_hora.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _filtrar(tabela, stmt, since, until, codigo_barras):
+    """Filtros de tempo e código comuns à listagem e à exportação"""
+    since, until = para_utc(since), para_utc(until)
+    if since is not None:
+        stmt = stmt.where(tabela.c.data_hora >= since)
+    if until is not None:
+        stmt = stmt.where(tabela.c.data_hora < until)
+    if codigo_barras is not None:
+        stmt = stmt.where(tabela.c.codigo_barras == codigo_barras)
+    return stmt
+
+
+def _paginar(db, tabela, stmt, since, until, codigo_barras, cursor, limit):
+    """Filtros de tempo/código + paginação por chave em (data_hora DESC, id DESC)"""
+    stmt = _filtrar(tabela, stmt, since, until, codigo_barras)
+    if cursor:
+        data_hora, id = decodificar_cursor(cursor)
+        stmt = stmt.where(or_(
+            tabela.c.data_hora < data_hora,
+            and_(tabela.c.data_hora == data_hora, tabela.c.id < id),
+        ))
+
+    limit = max(1, min(limit, LIMITE_MAXIMO))
+    linhas = db.execute(
+        stmt.order_by(tabela.c.data_hora.desc(), tabela.c.id.desc()).limit(limit + 1)
+    ).all()
+
+    proximo = None
+    if len(linhas) > limit:
+        linhas = linhas[:limit]
+        proximo = codificar_cursor(linhas[-1].data_hora, linhas[-1].id)
+    return linhas, proximo
+
+
+def listar_leituras(db, since=None, until=None, codigo_barras=None, cursor=None, limit=LIMITE_PADRAO):
+    """Uma página de contadores, mais recentes primeiro; retorna (linhas, próximo cursor)"""
+    return _paginar(db, _leituras, select(_leituras), since, until, codigo_barras, cursor, limit)
+
+
+def listar_eventos(db, since=None, until=None, codigo_barras=None, cursor=None, limit=LIMITE_PADRAO):
+    """Uma página do histórico de detecções; retorna (linhas, próximo cursor)"""
+    return _paginar(db, _eventos, select(_eventos), since, until, codigo_barras, cursor, limit)
+
+
+def iterar_registros(db, fonte="leituras", since=None, until=None, codigo_barras=None, lote=5000):
+    """Percorre leituras ou eventos em ordem de data_hora, `lote` linhas por vez.
+
+    Usa `yield_per` (cursor do lado do servidor no Postgres), então a memória
+    não cresce com o tamanho da tabela. Gera listas de linhas.
+    """
+    tabela = _FONTES[fonte]
+    stmt = _filtrar(tabela, select(tabela), since, until, codigo_barras)
+    resultado = db.execute(
+        stmt.order_by(tabela.c.data_hora, tabela.c.id).execution_options(yield_per=lote)
+    )
+    for linhas in resultado.partitions():
+        yield linhas
+
+
+def colunas_de(fonte="leituras"):
+    return [c.name for c in _FONTES[fonte].c]
@@ -0,0 +1,39 @@
+import json
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; o fallback gera os mesmos bytes
+    orjson = None
+
+
+def _padrao(valor):
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def dumps(conteudo) -> bytes:
+    """JSON compacto em UTF-8, igual ao do JSONResponse do FastAPI (datas em ISO 8601)"""
+    if orjson is not None:
+        return orjson.dumps(conteudo)
+    return json.dumps(
+        conteudo, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_padrao
+    ).encode("utf-8")
+
+
+def linhas_json(linhas) -> bytes:
+    """Serializa linhas do Core (tuplas nomeadas) direto para bytes, sem modelos intermediários"""
+    if not linhas:
+        return b"[]"
+    campos = linhas[0]._fields
+    return dumps([dict(zip(campos, linha)) for linha in linhas])
+
+
+class RespostaJSON(Response):
+    """Resposta com corpo já serializado: pula a validação do response_model"""
+    media_type = "application/json"
+
+    def __init__(self, corpo: bytes, **kwargs):
+        super().__init__(content=corpo, **kwargs)
@@ -0,0 +1,68 @@
+import os
+import threading
+
+from barcode_reader_simple import BarcodeReader
+from decode_pool import DecodePool
+
+
+class StreamManager:
+    """Registro de leitores por stream_id.
+
+    Cada câmera tem seu próprio BarcodeReader (threads de captura e controle
+    de estado); o pool de decodificação e a fila de gravação são compartilhados
+    entre todos os streams.
+    """
+
+    def __init__(self, decode_workers: int = None):
+        if decode_workers is None:
+            decode_workers = int(os.getenv("DECODE_WORKERS", "0"))
+        self.decode_workers = decode_workers
+        self._leitores = {}
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def start(self, stream_id: str, url: str, **opcoes) -> BarcodeReader:
+        with self._lock:
+            leitor = self._leitores.get(stream_id)
+            if leitor is None:
+                leitor = BarcodeReader(stream_id=stream_id, pool=self._pool_compartilhado())
+                self._leitores[stream_id] = leitor
+
+        # start_reading já para a leitura anterior do mesmo stream
+        leitor.start_reading(url, **opcoes)
+        return leitor
+
+    def stop(self, stream_id: str) -> bool:
+        with self._lock:
+            leitor = self._leitores.pop(stream_id, None)
+        if leitor is None:
+            return False
+        leitor.stop_reading()
+        return True
+
+    def stop_all(self):
+        with self._lock:
+            leitores = list(self._leitores.values())
+            self._leitores.clear()
+            pool, self._pool = self._pool, None
+        for leitor in leitores:
+            leitor.stop_reading()
+        if pool:
+            pool.close()
+
+    def get(self, stream_id: str):
+        with self._lock:
+            return self._leitores.get(stream_id)
+
+    def list(self):
+        with self._lock:
+            leitores = list(self._leitores.values())
+        return [leitor.get_stats() for leitor in leitores]
+
+    def _pool_compartilhado(self):
+        if self.decode_workers > 0 and self._pool is None:
+            self._pool = DecodePool(workers=self.decode_workers)
+        return self._pool
+
+
+stream_manager = StreamManager()
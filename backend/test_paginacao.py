@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Confere o cursor por chave (data_hora, id) de /leituras e /leituras/eventos
+contra um SQLite temporário: com várias linhas no mesmo data_hora e páginas
+pequenas, nenhuma linha pode ser pulada nem repetida.
+
+Uso: python test_paginacao.py (ou pytest test_paginacao.py)
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bancada import esvaziar_banco, rodar_testes, usar_banco_temporario
+
+usar_banco_temporario("test_paginacao_")
+
+from database import SessionEscrita
+from repository import inicializar_banco, listar_eventos, listar_leituras, registrar_leituras
+
+# Grupos de detecções com o mesmo data_hora; as páginas de 3 cortam os empates
+INICIO = datetime(2026, 1, 1, 8, 0, 0)
+GRUPOS = [
+    (INICIO, 7),
+    (INICIO + timedelta(microseconds=1), 1),
+    (INICIO + timedelta(seconds=1), 5),
+    (INICIO + timedelta(seconds=2), 3),
+]
+LIMITE = 3
+TOTAL = sum(total for _, total in GRUPOS)
+
+
+def setup_module():
+    esvaziar_banco()
+    inicializar_banco()
+    popular()
+
+
+def popular():
+    eventos = [
+        {"codigo_barras": f"789{g}{i:02d}", "descricao": "Não identificado", "stream_id": "cam1", "data_hora": data_hora}
+        for g, (data_hora, total) in enumerate(GRUPOS)
+        for i in range(total)
+    ]
+    with SessionEscrita() as db:
+        registrar_leituras(db, eventos)
+        db.commit()
+
+
+def percorrer(listar, **filtros):
+    """Segue o próximo cursor até o fim; retorna os ids na ordem e o número de páginas"""
+    ids, paginas, cursor = [], 0, None
+    with SessionEscrita() as db:
+        while True:
+            linhas, cursor = listar(db, cursor=cursor, limit=LIMITE, **filtros)
+            paginas += 1
+            ids.extend(l.id for l in linhas)
+            if cursor is None or paginas > 100:
+                return ids, paginas
+
+
+def _conferir_cursor(listar, total, **filtros):
+    with SessionEscrita() as db:
+        esperado = [l.id for l in listar(db, limit=total + 10, **filtros)[0]]
+    assert len(esperado) == total, f"{len(esperado)} linhas numa página só, esperado {total}"
+
+    ids, paginas = percorrer(listar, **filtros)
+    assert len(ids) == len(set(ids)), f"linhas repetidas em {paginas} páginas de {LIMITE}"
+    assert set(ids) == set(esperado), f"linhas puladas ({len(set(ids))}/{total})"
+    assert ids == esperado, "ordem diferente da página única (data_hora desc, id desc)"
+
+
+def test_cursor_leituras():
+    """/leituras"""
+    _conferir_cursor(listar_leituras, TOTAL)
+
+
+def test_cursor_eventos():
+    """/leituras/eventos"""
+    _conferir_cursor(listar_eventos, TOTAL)
+
+
+def test_cursor_com_since():
+    """/leituras com since no meio de um empate"""
+    _conferir_cursor(listar_leituras, TOTAL - GRUPOS[0][1], since=GRUPOS[1][0])
+
+
+def test_since_com_fuso():
+    """since com fuso (-03:00) é convertido para o UTC do banco"""
+    since = GRUPOS[1][0].replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=-3)))
+    _conferir_cursor(listar_leituras, TOTAL - GRUPOS[0][1], since=since)
+
+
+def test_cursor_invalido():
+    """Cursor inválido é recusado"""
+    with SessionEscrita() as db:
+        try:
+            listar_leituras(db, cursor="nao-e-um-cursor")
+        except ValueError:
+            return  # 400 na API
+    raise AssertionError("cursor inválido aceito sem ValueError")
+
+
+if __name__ == "__main__":
+    rodar_testes("TESTE DA PAGINAÇÃO POR CURSOR (SQLite temporário)", sys.modules[__name__])
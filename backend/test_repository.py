@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Confere a gravação de contadores contra um SQLite temporário: UPSERT dos
+lotes, migração de bancos antigos com códigos duplicados e a manutenção de
+relatorio_produtos ao cadastrar um produto.
+
+Uso: python test_repository.py (ou pytest test_repository.py; os testes rodam em sequência)
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bancada import esvaziar_banco, rodar_testes, usar_banco_temporario
+
+usar_banco_temporario("test_repository_")
+
+from sqlalchemy import inspect, text
+
+from database import SessionEscrita, engine
+from repository import cadastrar_produto, importar_produtos, inicializar_banco, registrar_leituras, versao_catalogo
+
+NAO_IDENTIFICADO = "Não identificado"
+INICIO = datetime(2026, 1, 1, 8, 0, 0)
+
+
+def setup_module():
+    esvaziar_banco()  # a migração parte de um banco antigo, sem as tabelas novas
+
+
+def conferir_relatorio(db, etapa):
+    """relatorio_produtos e leitura_rollups devem bater com leituras e o log de eventos"""
+    esperado = dict(db.execute(text(
+        "SELECT descricao, SUM(quantidade) FROM leituras GROUP BY descricao"
+    )).all())
+    relatorio = dict(db.execute(text(
+        "SELECT descricao, quantidade FROM relatorio_produtos WHERE quantidade <> 0"
+    )).all())
+    assert relatorio == esperado, f"{etapa}: relatorio_produtos {relatorio} != GROUP BY de leituras {esperado}"
+    for granularidade in ("minuto", "hora", "dia"):
+        rollups = dict(db.execute(text(
+            "SELECT descricao, SUM(quantidade) FROM leitura_rollups WHERE granularidade = :g GROUP BY descricao"
+        ), {"g": granularidade}).all())
+        # Cada evento conta para a descrição atual do seu código
+        eventos = dict(db.execute(text(
+            "SELECT l.descricao, COUNT(*) FROM leitura_eventos e "
+            "JOIN leituras l ON l.codigo_barras = e.codigo_barras GROUP BY l.descricao"
+        )).all())
+        assert rollups == eventos, f"{etapa}: leitura_rollups por {granularidade} {rollups} != eventos {eventos}"
+
+
+def criar_banco_antigo():
+    """leituras como nas versões antigas: sem stream_id e sem índice único no código"""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE leituras (id INTEGER PRIMARY KEY, codigo_barras VARCHAR, "
+            "descricao VARCHAR, quantidade INTEGER, data_hora DATETIME)"
+        ))
+        conn.execute(text(
+            "INSERT INTO leituras (codigo_barras, descricao, quantidade, data_hora) VALUES (:c, :d, :q, :h)"
+        ), [
+            {"c": "789A", "d": NAO_IDENTIFICADO, "q": 2, "h": INICIO},
+            {"c": "789B", "d": "Biscoito", "q": 1, "h": INICIO},
+            {"c": "789A", "d": NAO_IDENTIFICADO, "q": 3, "h": INICIO + timedelta(minutes=5)},
+            {"c": "789A", "d": NAO_IDENTIFICADO, "q": 1, "h": INICIO + timedelta(minutes=2)},
+        ])
+
+
+def test_migracao():
+    """Banco antigo com leituras duplicadas"""
+    criar_banco_antigo()
+    inicializar_banco()
+
+    with SessionEscrita() as db:
+        linhas = db.execute(text(
+            "SELECT codigo_barras, quantidade, data_hora FROM leituras ORDER BY codigo_barras"
+        )).all()
+        assert [(l.codigo_barras, l.quantidade) for l in linhas] == [("789A", 6), ("789B", 1)], \
+            f"duplicados não somados numa linha por código: {[tuple(l[:2]) for l in linhas]}"
+        assert str(linhas[0].data_hora).startswith(str(INICIO + timedelta(minutes=5))), \
+            "data_hora da linha unificada não é a mais recente"
+        assert "stream_id" in {c["name"] for c in inspect(engine).get_columns("leituras")}, \
+            "coluna stream_id não adicionada"
+        assert any(i["unique"] and i["column_names"] == ["codigo_barras"]
+                   for i in inspect(engine).get_indexes("leituras")), \
+            "índice único em codigo_barras não criado"
+        conferir_relatorio(db, "primeira carga")
+
+
+def _evento(codigo, descricao, minutos, stream_id="cam1"):
+    return {"codigo_barras": codigo, "descricao": descricao, "stream_id": stream_id,
+            "data_hora": INICIO + timedelta(minutes=minutos)}
+
+
+def test_upsert():
+    """UPSERT dos contadores (ON CONFLICT DO UPDATE)"""
+    with SessionEscrita() as db:
+        # Mesmo código repetido no lote e códigos que já existem no banco
+        registrar_leituras(db, [
+            _evento("789A", NAO_IDENTIFICADO, 10),
+            _evento("789A", NAO_IDENTIFICADO, 11, "cam2"),
+            _evento("789C", "Leite", 12),
+        ])
+        db.commit()
+        registrar_leituras(db, [_evento("789C", "Leite", 13), _evento("789B", "Biscoito", 14)])
+        db.commit()
+
+        contadores = dict(db.execute(text("SELECT codigo_barras, quantidade FROM leituras")).all())
+        assert contadores == {"789A": 8, "789B": 2, "789C": 2}, f"contadores somados: {contadores}"
+        ultima = db.execute(text("SELECT stream_id FROM leituras WHERE codigo_barras = '789A'")).scalar()
+        assert ultima == "cam2", f"stream_id {ultima} não é o da leitura mais recente do lote"
+        eventos = db.execute(text("SELECT COUNT(*) FROM leitura_eventos")).scalar()
+        assert eventos == 5, f"{eventos} eventos para 5 detecções"
+        conferir_relatorio(db, "após os lotes")
+
+
+def test_reatribuicao():
+    """Cadastro de produto com leituras anteriores"""
+    with SessionEscrita() as db:
+        produto = cadastrar_produto(db, "789A", "Água Mineral")
+        db.commit()
+        assert produto is not None, "produto não cadastrado"
+        descricao = db.execute(text("SELECT descricao FROM leituras WHERE codigo_barras = '789A'")).scalar()
+        assert descricao == "Água Mineral", f"leituras do código ficaram com a descrição {descricao}"
+        conferir_relatorio(db, "após reatribuir")
+
+        assert cadastrar_produto(db, "789A", "Outra") is None, "código já cadastrado foi aceito"
+        db.rollback()
+
+        registrar_leituras(db, [_evento("789A", "Água Mineral", 20)])
+        db.commit()
+        conferir_relatorio(db, "nova leitura após o cadastro")
+
+
+
+def test_versao_catalogo():
+    """Troca de descrição muda a versão do catálogo"""
+    with SessionEscrita() as db:
+        antes = versao_catalogo(db)
+        importar_produtos(db, [{"codigo_barras": "789A", "descricao": "Água com Gás"}], conflito="update")
+        db.commit()
+        depois = versao_catalogo(db)
+        assert depois[:2] == antes[:2], f"contagem e maior id mudaram sem cadastro: {antes} -> {depois}"
+        assert depois != antes, "versão igual após trocar a descrição"
+
+if __name__ == "__main__":
+    rodar_testes("TESTE DO REPOSITÓRIO (SQLite temporário)", sys.modules[__name__])
@@ -4,14 +4,15 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from database import engine, Base, SessionLocal, Produto
+from database import SessionLocal, Produto
+from repository import inicializar_banco
 
 def update_database():
     print("=== ATUALIZANDO BANCO DE DADOS ===")
     
     try:
         # Criar todas as tabelas (incluindo a nova tabela produtos)
-        Base.metadata.create_all(bind=engine)
+        inicializar_banco()
         print("✅ Tabelas criadas/atualizadas com sucesso!")
         
         # Verificar se a tabela produtos foi criada
@@ -10,6 +10,15 @@ interface Leitura {
   data_hora: string
 }
 
+interface EventoAoVivo {
+  tipo: 'entrada' | 'saida'
+  codigo_barras: string
+  descricao: string | null
+  stream_id: string | null
+  data_hora: string
+  ocorrencias: number
+}
+
 export default function Home() {
   const [leituras, setLeituras] = useState<Leitura[]>([])
   const [streamUrl, setStreamUrl] = useState('http://192.168.1.244:8080/video')
@@ -19,11 +28,49 @@ export default function Home() {
   const API_BASE = process.env.NODE_ENV === 'production' ? '/api' : 'http://localhost:8000'
 
   useEffect(() => {
-    const interval = setInterval(fetchLeituras, 2000)
     fetchLeituras()
-    return () => clearInterval(interval)
+
+    // Feed ao vivo (SSE); sem ele (ex.: deploy serverless) volta ao polling
+    let interval: ReturnType<typeof setInterval> | undefined
+    const source = new EventSource(`${API_BASE}/leituras/live`)
+    let conectado = false
+
+    source.onopen = () => {
+      // Ao reconectar, sincroniza o que foi perdido enquanto a conexão caiu
+      if (conectado) fetchLeituras()
+      conectado = true
+    }
+    source.addEventListener('entrada', (e) => aplicarEntrada(JSON.parse((e as MessageEvent).data)))
+    source.addEventListener('resync', () => fetchLeituras())
+    source.onerror = () => {
+      if (!conectado) {
+        source.close()
+        interval = setInterval(fetchLeituras, 2000)
+      }
+    }
+
+    return () => {
+      source.close()
+      if (interval) clearInterval(interval)
+    }
   }, [])
 
+  const aplicarEntrada = (evento: EventoAoVivo) => {
+    setLeituras((atuais) => {
+      const existente = atuais.find((l) => l.codigo_barras === evento.codigo_barras)
+      const atualizada: Leitura = existente
+        ? { ...existente, quantidade: existente.quantidade + evento.ocorrencias, data_hora: evento.data_hora }
+        : {
+            id: 0,
+            codigo_barras: evento.codigo_barras,
+            descricao: evento.descricao ?? 'Não identificado',
+            quantidade: evento.ocorrencias,
+            data_hora: evento.data_hora
+          }
+      return [atualizada, ...atuais.filter((l) => l.codigo_barras !== evento.codigo_barras)]
+    })
+  }
+
   const fetchLeituras = async () => {
     try {
       const response = await fetch(`${API_BASE}/leituras`)
@@ -131,7 +178,7 @@ export default function Home() {
             </thead>
             <tbody>
               {leituras.map((leitura) => (
-                <tr key={leitura.id}>
+                <tr key={leitura.codigo_barras}>
                   <td>{leitura.codigo_barras}</td>
                   <td>{leitura.descricao}</td>
                   <td>{leitura.quantidade}</td>
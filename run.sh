@@ -40,7 +40,7 @@ echo
 echo "=== Instruções de Execução ==="
 echo
 echo "1. Backend (Terminal 1):"
-echo "   cd backend && python3 main.py"
+echo "   cd backend && python3 -m uvicorn main:app --host 0.0.0.0 --port 8000"
 echo
 echo "2. Frontend (Terminal 2):"
 echo "   cd frontend && npm run dev"
@@ -11,7 +11,7 @@ echo
 echo "1. Backend (Terminal 1):"
 echo "   python3 test_backend.py"
 echo "   OU manualmente:"
-echo "   cd backend && export PATH=\$HOME/.local/bin:\$PATH && python3 main.py"
+echo "   cd backend && export PATH=\$HOME/.local/bin:\$PATH && python3 -m uvicorn main:app --host 0.0.0.0 --port 8000"
 echo
 echo "2. Frontend (Terminal 2):"
 echo "   export PATH=\"/home/kaua145/Documentos/Projetos/TCC_Leitura_Barras/node-v18.18.0-linux-x64/bin:\$PATH\""
@@ -19,7 +19,7 @@ def test_backend():
         # Iniciar servidor
         print("Iniciando servidor FastAPI...")
         process = subprocess.Popen([
-            sys.executable, "main.py"
+            sys.executable, "-m", "uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000"
         ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         
         # Aguardar um pouco para o servidor iniciar